@@ -0,0 +1,417 @@
+"""
+Local mock of mans.e-st.lv portal and STScraper end-to-end benchmark
+"""
+
+import os
+import sys
+import json
+import html
+import time
+import secrets
+import argparse
+import calendar
+import tempfile
+import subprocess
+import tracemalloc
+import multiprocessing
+from datetime import date, datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit, parse_qs
+
+from main import STScraper, ResponseCache
+
+LOGIN = 'user'
+PASSWORD = 'secret'
+OBJECT_ID = '40X000000000000X'
+METER_ID = '12345678'
+
+
+class MockPortalHandler(BaseHTTPRequestHandler):
+    """
+    Request handler mimicking the portal login form, session cookies and chart page
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, so delayed ACKs would add latency otherwise
+    disable_nagle_algorithm = True
+
+    # Shared by all handlers of the server process
+    sessions = {}
+    stats = {'get': 0, 'post': 0, 'logins': 0}
+    latency = 0.0
+    points = None
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def _send(self, status, body='', headers=None):
+        """
+        Send html response
+        """
+        payload = body.encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _get_session(self):
+        """
+        Get session of the request cookie, starting a new one when there is none
+
+        :return: session ID and session data
+        """
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        session_id = cookie['session'].value if 'session' in cookie else None
+
+        if session_id not in self.sessions:
+            session_id = secrets.token_hex(16)
+            self.sessions[session_id] = {'token': secrets.token_hex(16), 'authenticated': False}
+
+        return session_id, self.sessions[session_id]
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Serve chart page to logged in sessions and login page to others
+        """
+        url = urlsplit(self.path)
+
+        if url.path == '/__stats':
+            self._send(200, json.dumps(self.stats))
+            return
+
+        self.stats['get'] += 1
+        time.sleep(self.latency)
+        session_id, session = self._get_session()
+        headers = {'Set-Cookie': f'session={session_id}; Path=/; HttpOnly'}
+
+        if url.path != urlsplit(STScraper.DATA_URL).path:
+            self._send(404, 'Not found', headers)
+        elif session['authenticated']:
+            self._send(200, chart_page(parse_qs(url.query), self.points), headers)
+        else:
+            self._send(200, login_page(session['token'], self.path), headers)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        Handle login form submission
+        """
+        self.stats['post'] += 1
+        time.sleep(self.latency)
+        session_id, session = self._get_session()
+
+        length = int(self.headers.get('Content-Length', 0))
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+
+        if urlsplit(self.path).path != urlsplit(STScraper.LOGIN_URL).path:
+            self._send(404, 'Not found')
+            return
+
+        if form.get('_token') == session['token'] and form.get('login') == LOGIN \
+                and form.get('password') == PASSWORD:
+            self.stats['logins'] += 1
+            session['authenticated'] = True
+
+        self._send(302, headers={
+            'Location': form.get('returnUrl') or '/',
+            'Set-Cookie': f'session={session_id}; Path=/; HttpOnly'
+        })
+
+
+def login_page(token, return_url):
+    """
+    Render login page
+
+    :param token: session CSRF token
+    :param return_url: url to redirect to after login
+    :rtype: str
+    """
+    return (
+        '<!DOCTYPE html><html><head><title>Mans e-ST</title></head><body>'
+        f'<form method="post" action="{STScraper.LOGIN_URL}">'
+        f'<input type="hidden" name="_token" value="{token}">'
+        f'<input type="hidden" name="returnUrl" value="{html.escape(return_url)}">'
+        '<input type="text" name="login" value="">'
+        '<input type="password" name="password" value="">'
+        '<button type="submit">Ienākt</button></form></body></html>'
+    )
+
+
+def chart_series(params, points=None):
+    """
+    Generate chart timestamps of the requested period
+
+    :param params: data url parameters
+    :param points: number of hourly points from the period start overriding the period default,
+                   e.g. to make bigger payloads
+    :return: list of JS timestamps
+    """
+    period = params['period'][0]
+
+    if period == STScraper.PERIOD_DAY:
+        day, month, year = (int(value) for value in params['date'][0].split('.'))
+        starts = [datetime(year, month, day) + timedelta(hours=hour) for hour in range(24)]
+    elif period == STScraper.PERIOD_MONTH:
+        year, month = int(params['year'][0]), int(params['month'][0])
+        days = calendar.monthrange(year, month)[1]
+        if params.get('granularity', [None])[0] == STScraper.GRANULARITY_HOUR:
+            starts = [datetime(year, month, 1) + timedelta(hours=hour) for hour in range(days * 24)]
+        else:
+            starts = [datetime(year, month, day) for day in range(1, days + 1)]
+    else:
+        starts = [datetime(int(params['year'][0]), month, 1) for month in range(1, 13)]
+
+    if points:
+        starts = [starts[0] + timedelta(hours=hour) for hour in range(points)]
+
+    return [int(start.replace(tzinfo=timezone.utc).timestamp()) * 1000 for start in starts]
+
+
+def chart_page(params, points=None):
+    """
+    Render chart page with A+ and A- data
+
+    :param params: data url parameters
+    :param points: number of points per direction
+    :rtype: str
+    """
+    timestamps = chart_series(params, points)
+    values = {
+        direction: {'total': {'data': [
+            {'timestamp': timestamp, 'value': round((index % 24) * factor, 3)}
+            for index, timestamp in enumerate(timestamps)
+        ]}}
+        for direction, factor in (('A+', 0.125), ('A-', 0.05))
+    }
+
+    return (
+        '<!DOCTYPE html><html><head><title>Mans e-ST</title></head><body>'
+        + '<div class="row"><span>Patēriņa grafiki</span></div>' * 50
+        + f'<div class="chart" data-values="{html.escape(json.dumps({"values": values}))}"></div>'
+        '</body></html>'
+    )
+
+
+def serve(port, latency=0.0, points=None, ready=None):
+    """
+    Run mock portal server
+
+    :param port: port to listen on
+    :param latency: seconds to delay each response
+    :param points: number of chart points per direction
+    :param ready: optional event set when the server is listening
+    """
+    MockPortalHandler.latency = latency
+    MockPortalHandler.points = points
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), MockPortalHandler)
+    if ready:
+        ready.set()
+    server.serve_forever()
+
+
+def local_scraper(port, **kwargs):
+    """
+    Create scraper using the mock portal
+
+    :param port: mock portal port
+    :param kwargs: additional STScraper arguments
+    :rtype: STScraper
+    """
+    host = f'http://127.0.0.1:{port}'
+    scraper_class = type('LocalSTScraper', (STScraper,), {
+        'BASE_HOST': host,
+        'LOGIN_URL': host + urlsplit(STScraper.LOGIN_URL).path,
+        'DATA_URL': host + urlsplit(STScraper.DATA_URL).path
+    })
+    return scraper_class(LOGIN, PASSWORD, OBJECT_ID, METER_ID, **kwargs)
+
+
+def get_server_stats(scraper):
+    """
+    Get mock portal request counters
+    """
+    return scraper.session.get(scraper.BASE_HOST + '/__stats', timeout=10).json()
+
+
+def percentile(values, share):
+    """
+    Get nearest rank percentile of the values
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))]
+
+
+def run_scenario(port, name, call, iterations):
+    """
+    Measure scenario latency, throughput and memory
+
+    :param port: mock portal port
+    :param name: scenario name
+    :param call: callable(scraper) doing the measured retrieval
+    :param iterations: number of timed calls
+    :return: scenario results
+    :rtype: dict
+    """
+    scraper = local_scraper(port)
+    call(scraper)  # warm up, includes login
+
+    before = get_server_stats(scraper)
+    latencies = []
+    started = time.perf_counter()
+
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        call(scraper)
+        latencies.append(time.perf_counter() - call_started)
+
+    elapsed = time.perf_counter() - started
+    after = get_server_stats(scraper)
+    requests_count = after['get'] + after['post'] - before['get'] - before['post']
+
+    # Memory is measured in a separate call, as tracing slows everything down
+    tracemalloc.start()
+    call(scraper)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'scenario': name,
+        'calls/s': iterations / elapsed,
+        'requests/s': requests_count / elapsed,
+        'p50 ms': percentile(latencies, 0.5) * 1000,
+        'p90 ms': percentile(latencies, 0.9) * 1000,
+        'p99 ms': percentile(latencies, 0.99) * 1000,
+        'py peak MB': peak / 1024 / 1024
+    }
+
+
+def run_startup(port, iterations):
+    """
+    Measure wall time of fresh CLI processes, which is dominated by interpreter startup and imports
+
+    :param port: mock portal port used to fill the response cache
+    :param iterations: number of timed runs per scenario
+    :return: list of scenario results
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Cache keys do not depend on the portal host, so the CLI gets served from cache
+        local_scraper(port, cache=ResponseCache(cache_dir)).get_month_data(year='2024', month='02')
+
+        arguments = ['--username', LOGIN, '--password', PASSWORD, '--objectid', OBJECT_ID,
+                     '--meter', METER_ID, '--period', 'month', '--year', '2024', '--month', '02',
+                     '--cache-dir', cache_dir]
+        # Script is compiled on every run, while module run uses cached bytecode
+        scenarios = (
+            ('python', [sys.executable, '-c', 'pass']),
+            ('import main', [sys.executable, '-c', 'import main']),
+            ('main.py --help', [sys.executable, script, '--help']),
+            ('main.py cached', [sys.executable, script] + arguments),
+            ('-m main cached', [sys.executable, '-m', 'main'] + arguments),
+        )
+        results = []
+
+        for name, command in scenarios:
+            latencies = []
+
+            for _ in range(iterations):
+                started = time.perf_counter()
+                subprocess.run(command, check=True, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, cwd=os.path.dirname(script))
+                latencies.append(time.perf_counter() - started)
+
+            results.append({
+                'scenario': name,
+                'min ms': min(latencies) * 1000,
+                'p50 ms': percentile(latencies, 0.5) * 1000,
+                'p90 ms': percentile(latencies, 0.9) * 1000
+            })
+
+    return results
+
+
+def print_table(results):
+    """
+    Print results as a text table
+    """
+    columns = list(results[0])
+    rows = [[f'{value:.2f}' if isinstance(value, float) else str(value) for value in result.values()]
+            for result in results]
+    widths = [max([len(column), 10] + [len(row[index]) for row in rows])
+              for index, column in enumerate(columns)]
+    print('  '.join(column.rjust(width) for column, width in zip(columns, widths)))
+
+    for row in rows:
+        print('  '.join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def main():
+    """
+    Main function
+    """
+    parser = argparse.ArgumentParser(description='STScraper benchmark against local mock portal')
+    parser.add_argument('--port', default=8765, type=int, help='Mock portal port')
+    parser.add_argument('--latency', default=0.0, type=float,
+                        help='Mock portal response delay in milliseconds')
+    parser.add_argument('--points', default=None, type=int,
+                        help='Chart points per direction, defaults to the period length')
+    parser.add_argument('--iterations', default=50, type=int, help='Timed calls per scenario')
+    parser.add_argument('--range-days', default=60, type=int, help='Days of range scenario')
+    parser.add_argument('--workers', default=STScraper.DEFAULT_WORKERS, type=int,
+                        help='Parallel requests of range scenario')
+    parser.add_argument('--serve', action='store_true',
+                        help='Only run the mock portal until interrupted')
+    parser.add_argument('--startup', action='store_true',
+                        help='Measure CLI process startup instead of retrieval throughput')
+    opts = parser.parse_args()
+
+    if opts.serve:
+        serve(opts.port, opts.latency / 1000, opts.points)
+        return
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, daemon=True,
+                                     args=(opts.port, opts.latency / 1000, opts.points, ready))
+    server.start()
+    ready.wait(10)
+
+    if opts.startup:
+        try:
+            results = run_startup(opts.port, opts.iterations)
+        finally:
+            server.terminate()
+
+        print_table(results)
+        return
+
+    range_end = date(2024, 12, 31)
+    range_start = range_end - timedelta(days=opts.range_days - 1)
+
+    scenarios = (
+        ('day', lambda scraper: scraper.get_day_data(year='2024', month='02', day='14')),
+        ('month', lambda scraper: scraper.get_month_data(year='2024', month='02')),
+        ('year', lambda scraper: scraper.get_year_data(year='2024')),
+        (f'range {opts.range_days}d', lambda scraper: scraper.get_range_data(
+            range_start, range_end, max_workers=opts.workers)),
+    )
+
+    try:
+        results = [
+            run_scenario(opts.port, name, call,
+                         max(1, opts.iterations // opts.range_days) if name.startswith('range')
+                         else opts.iterations)
+            for name, call in scenarios
+        ]
+    finally:
+        server.terminate()
+
+    print_table(results)
+
+
+if __name__ == '__main__':
+    main()
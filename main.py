@@ -2,227 +2,3438 @@
 Smart electricity meter consumption data scraper for e-st.lv
 """
 
+import os
+import re
+import sys
+import html
 import json
+import mmap
+import bisect
+import struct
+import time
+import sqlite3
+import random
+import hashlib
+import threading
 import argparse
-from datetime import datetime, timezone, timedelta
-from urllib.parse import urlencode
-import requests
-from pyquery import PyQuery
+import tempfile
+from functools import lru_cache
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timezone, timedelta
+from urllib.parse import urlencode, urlsplit, parse_qs
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+@lru_cache(maxsize=None)
+def _import_numpy():
+    """
+    Import optional numpy package once
+
+    :return: numpy module or None when it is not installed
+    """
+    try:
+        import numpy  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return numpy
+
+
+# Heavy dependencies (requests, pyquery, numpy, asyncio, http.server, concurrent.futures) are
+# imported only when needed, so that short runs served from cache start fast
+
+
+def _create_session(cookie_store=None):
+    """
+    Create requests session with saved cookies loaded
+
+    :param cookie_store: optional persistent session storage
+    :type cookie_store: CookieStore | None
+    :rtype: requests.Session
+    """
+    import requests  # pylint: disable=import-outside-toplevel
+
+    session = requests.Session()
+
+    if cookie_store:
+        cookie_store.load(session)
+
+    return session
+
+
+def _portal_errors():
+    """
+    Get exceptions of failed portal retrieval, evaluated only when an exception is handled
+
+    :rtype: tuple
+    """
+    import requests  # pylint: disable=import-outside-toplevel
+
+    return requests.RequestException, CircuitOpenError, LoginError
+
+
+_TAG_RE = re.compile(r'''<(div|input)\b((?:[^>"']|"[^"]*"|'[^']*')*)>''', re.IGNORECASE)
+_INPUT_RE = re.compile(r'<input', re.IGNORECASE)
+_ATTR_RE = re.compile(r'''([^\s"'=<>/]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?''')
+
+
+def _unescape(value):
+    """
+    Decode html entities, using plain replacements for the entities of escaped json
+
+    :param value: attribute value
+    :rtype: str
+    """
+    if '&' not in value:
+        return value
+
+    decoded = (value.replace('&quot;', '"').replace('&#34;', '"').replace('&#39;', "'")
+               .replace('&#039;', "'").replace('&lt;', '<').replace('&gt;', '>'))
+
+    if decoded.count('&') == decoded.count('&amp;'):
+        return decoded.replace('&amp;', '&')
+
+    return html.unescape(value)
+
+
+def _parse_tag(text, pos):
+    """
+    Parse div or input tag starting at the given position
+
+    :param text: page html
+    :param pos: tag start position
+    :return: tag name and attributes or None when there is no such tag
+    """
+    match = _TAG_RE.match(text, pos)
+    if not match:
+        return None
+
+    attrs = {}
+    for attr in _ATTR_RE.finditer(match.group(2)):
+        value = next((group for group in attr.groups()[1:] if group is not None), '')
+        attrs.setdefault(attr.group(1).lower(), _unescape(value))
+
+    return match.group(1).lower(), attrs
+
+
+def _scan_chart_values(text):
+    """
+    Find data-values attribute of div.chart without parsing the whole page
+
+    :param text: page html
+    :return: chart json or None when not found
+    :rtype: str | None
+    """
+    pos = text.find('data-values')
+    while pos != -1:
+        tag = _parse_tag(text, text.rfind('<', 0, pos))
+        if tag:
+            name, attrs = tag
+            if name == 'div' and 'chart' in attrs.get('class', '').split() and 'data-values' in attrs:
+                return attrs['data-values']
+        pos = text.find('data-values', pos + 1)
+
+    return None
+
+
+def _scan_input_values(text, fields):
+    """
+    Find values of named inputs, stops as soon as all of them are found
+
+    :param text: page html
+    :param fields: input names
+    :return: input values by name, missing inputs are left out
+    :rtype: dict
+    """
+    values = {}
+    match = _INPUT_RE.search(text)
+    while match and len(values) < len(fields):
+        tag = _parse_tag(text, match.start())
+        if tag:
+            _, attrs = tag
+            if attrs.get('name') in fields:
+                values.setdefault(attrs['name'], attrs.get('value'))
+        match = _INPUT_RE.search(text, match.end())
+
+    return values
+
+
+
+def _chart_columns(chart):
+    """
+    Get timestamp and value columns of A+ and A- series of graph json
+
+    :param chart: graph json
+    :return: [timestamps, values] by direction
+    :rtype: dict
+    """
+    columns = {}
+    for direction in ('A+', 'A-'):
+        if direction in chart['values']:
+            points = chart['values'][direction]['total']['data']
+            columns[direction] = [[point['timestamp'] for point in points],
+                                  [point['value'] for point in points]]
+
+    return columns
+
+
+class CookieStore:
+    """
+    Persistent per-username cookie jar, lets consecutive runs reuse a logged in portal session
+    """
+
+    # Portal sessions are considered stale after this many seconds since the last save
+    DEFAULT_MAX_AGE = 60 * 60
+
+    def __init__(self, directory, login, max_age=DEFAULT_MAX_AGE):
+        """
+        Class initialisation
+
+        :param directory: directory where cookie files are kept
+        :param login: username the cookies belong to
+        :param max_age: seconds a saved session stays valid after its last use
+        """
+        self.max_age = max_age
+        self._saved = 0
+        name = hashlib.sha256(login.encode('utf8')).hexdigest()[:32]
+        self.path = os.path.join(directory, f'{name}.json')
+
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _lock(self):
+        """
+        Hold an exclusive lock on the cookie file while reading or writing it
+        """
+        with open(self.path + '.lock', 'a', encoding='utf8') as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def load(self, session):
+        """
+        Load saved cookies into the session
+
+        :param session: session to populate
+        :type session: requests.Session
+        :return: whether any unexpired cookies were loaded
+        :rtype: bool
+        """
+        with self._lock():
+            try:
+                with open(self.path, encoding='utf8') as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                return False
+
+        now = time.time()
+        if now - stored.get('saved', 0) > self.max_age:
+            return False
+        self._saved = stored['saved']
+
+        loaded = False
+        for cookie in stored.get('cookies', []):
+            if cookie['expires'] is not None and cookie['expires'] <= now:
+                continue
+            session.cookies.set(
+                cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'],
+                expires=cookie['expires'], secure=cookie['secure']
+            )
+            loaded = True
+
+        return loaded
+
+    def save(self, session):
+        """
+        Save session cookies, replacing the stored file atomically
+
+        :param session: session to persist
+        :type session: requests.Session
+        """
+        stored = {
+            'saved': time.time(),
+            'cookies': [{
+                'name': cookie.name,
+                'value': cookie.value,
+                'domain': cookie.domain,
+                'path': cookie.path,
+                'expires': cookie.expires,
+                'secure': cookie.secure
+            } for cookie in session.cookies]
+        }
+
+        with self._lock():
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf8') as f:
+                    json.dump(stored, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+        self._saved = stored['saved']
+
+    def touch(self, session):
+        """
+        Mark the session as just used, so that max_age counts from the last successful request
+        rather than from the login. The file is rewritten at most once per tenth of max_age.
+
+        :param session: session that has just been used
+        :type session: requests.Session
+        """
+        if time.time() - self._saved > self.max_age / 10:
+            self.save(session)
+
+    def clear(self):
+        """
+        Forget the stored session
+        """
+        with self._lock():
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class ResponseCache:
+    """
+    On-disk portal response cache. Data of final periods are kept until evicted,
+    data of periods still in progress expire after ttl seconds. Least recently used
+    entries are evicted when the cache grows over max_size bytes.
+
+    Any object providing get(key) and set(key, data, final) methods can be used instead.
+    """
+
+    DEFAULT_TTL = 15 * 60
+    DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, directory, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+        """
+        Class initialisation
+
+        :param directory: directory where cache entries are kept
+        :param ttl: seconds data of periods in progress stay valid
+        :param max_size: maximum total size of cache entries in bytes
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_size = max_size
+
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+        # Guards the total size, which concurrent sets and evictions update
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        """
+        Get the file path of cache entry
+        """
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf8')).hexdigest() + '.json')
+
+    def _entries(self):
+        """
+        List cache entries as (path, size, last used time) tuples
+        """
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_size, stat.st_mtime
+
+    def get(self, key):
+        """
+        Get cached data
+
+        :param key: normalised request key
+        :return: cached data or None when missing or expired
+        """
+        path = self._path(key)
+
+        try:
+            with open(path, encoding='utf8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry['expires'] is not None and entry['expires'] <= time.time():
+            return None
+
+        try:
+            # Last modification time marks the last use for eviction
+            os.utime(path)
+        except OSError:
+            pass
+
+        return entry['data']
+
+    def set(self, key, data, final=False):
+        """
+        Store data in cache
+
+        :param key: normalised request key
+        :param data: data to store
+        :param final: whether the data can no longer change
+        """
+        path = self._path(key)
+        entry = json.dumps({
+            'expires': None if final else time.time() + self.ttl,
+            'data': data
+        })
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf8') as f:
+                f.write(entry)
+
+            with self._lock:
+                try:
+                    self._size -= os.path.getsize(path)
+                except OSError:
+                    pass
+
+                os.replace(tmp_path, path)
+                self._size += len(entry.encode('utf8'))
+
+                if self._size > self.max_size:
+                    self._evict()
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _evict(self):
+        """
+        Remove least recently used entries until the cache fits in max_size,
+        called with the lock held
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self._size = sum(size for _, size, _ in entries)
+
+        for path, size, _ in entries:
+            if self._size <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+
+class MemoryCache:
+    """
+    In-memory response cache with the same semantics as ResponseCache,
+    limited by the number of entries instead of size
+    """
+
+    DEFAULT_MAX_ENTRIES = 4096
+
+    def __init__(self, ttl=ResponseCache.DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Class initialisation
+
+        :param ttl: seconds data of periods in progress stay valid
+        :param max_entries: maximum number of cached responses
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get cached data
+
+        :param key: normalised request key
+        :return: cached data or None when missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires, data = entry
+            if expires is not None and expires <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data, final=False):
+        """
+        Store data in cache
+
+        :param key: normalised request key
+        :param data: data to store
+        :param final: whether the data can no longer change
+        """
+        with self._lock:
+            self._entries[key] = (None if final else time.time() + self.ttl, data)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SingleFlight:
+    """
+    Lets concurrent identical calls share one execution and its result
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        """
+        Call the function unless a call with the same key is already in flight,
+        in which case wait for it and return its result
+
+        :param key: call key
+        :param function: callable without arguments
+        :return: function result
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+
+        if leader:
+            try:
+                call['result'] = function()
+            except BaseException as e:  # pylint: disable=broad-except
+                call['error'] = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call['done'].set()
+        else:
+            call['done'].wait()
+
+        if call['error'] is not None:
+            raise call['error']
+
+        return call['result']
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter with AIMD concurrency control, shared by scrapers
+    doing requests in parallel. Rate and concurrency are halved on slow responses,
+    429/5xx statuses, failed requests and login page bounces, and increased
+    additively while responses are healthy.
+    """
+
+    DEFAULT_RATE = 2.0
+    DEFAULT_MAX_RATE = 10.0
+    DEFAULT_CONCURRENCY = 4
+    MIN_RATE = 0.1
+
+    # Additive increase of the rate per healthy response in requests per second
+    RATE_INCREASE = 0.1
+    DECREASE_FACTOR = 0.5
+    # Decreases closer than this many seconds are caused by the same trouble, so only the first counts
+    DECREASE_INTERVAL = 1.0
+    # Responses taking longer than this many seconds are considered slow
+    SLOW_RESPONSE = 10.0
+
+    def __init__(self, rate=DEFAULT_RATE, max_rate=DEFAULT_MAX_RATE,
+                 max_concurrency=DEFAULT_CONCURRENCY, slow_response=SLOW_RESPONSE):
+        """
+        Class initialisation
+
+        :param rate: initial requests per second
+        :param max_rate: maximum requests per second
+        :param max_concurrency: maximum number of parallel requests
+        :param slow_response: seconds after which response is considered slow
+        """
+        self.rate = min(rate, max_rate)
+        self.max_rate = max_rate
+        self.concurrency = float(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.slow_response = slow_response
+
+        self.requests = 0
+        self.backoffs = 0
+
+        self._tokens = 1.0
+        self._active = 0
+        self._updated = time.monotonic()
+        self._decreased = float('-inf')
+        self._condition = threading.Condition()
+
+    def _refill(self):
+        """
+        Add tokens accumulated since the last update, bucket holds up to one second of requests
+        """
+        now = time.monotonic()
+        self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """
+        Wait until both a token and a concurrency slot are available
+        """
+        with self._condition:
+            while True:
+                self._refill()
+
+                if self._active < int(self.concurrency):
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self._active += 1
+                        return
+                    self._condition.wait((1 - self._tokens) / self.rate)
+                else:
+                    self._condition.wait()
+
+    def release(self, duration, status_code=None):
+        """
+        Free concurrency slot and adjust the limits by the request outcome
+
+        :param duration: request duration in seconds
+        :param status_code: response status code or None when request failed
+        """
+        with self._condition:
+            self._active -= 1
+            self.requests += 1
+
+            if status_code is None or status_code == 429 or status_code >= 500 \
+                    or duration > self.slow_response:
+                self._decrease()
+            else:
+                self.rate = min(self.max_rate, self.rate + self.RATE_INCREASE)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+            self._condition.notify_all()
+
+    def backoff(self):
+        """
+        Slow down after a sign of throttling not visible in the response status, e.g. login page bounce
+        """
+        with self._condition:
+            self._decrease()
+            self._condition.notify_all()
+
+    def _decrease(self):
+        """
+        Multiplicatively decrease the rate and concurrency
+        """
+        now = time.monotonic()
+        if now - self._decreased < self.DECREASE_INTERVAL:
+            return
+
+        self._decreased = now
+        self.backoffs += 1
+        self._refill()
+        self.rate = max(self.MIN_RATE, self.rate * self.DECREASE_FACTOR)
+        self.concurrency = max(1.0, self.concurrency * self.DECREASE_FACTOR)
+
+    def get_metrics(self):
+        """
+        Get current limits and counters
+
+        :rtype: dict
+        """
+        with self._condition:
+            return {
+                'rate': self.rate,
+                'concurrency': int(self.concurrency),
+                'active': self._active,
+                'requests': self.requests,
+                'backoffs': self.backoffs
+            }
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised instead of doing requests while the portal is considered down
+    """
+
+
+class LoginError(ValueError):
+    """
+    Raised when the portal does not let the session log in, e.g. on wrong credentials
+    """
+
+
+class ResiliencePolicy:
+    """
+    Request timeouts, retries with exponential backoff and jitter, and circuit breaker
+    failing fast after consecutive failures. Share one policy between scrapers so that
+    they share the circuit breaker state.
+    """
+
+    DEFAULT_CONNECT_TIMEOUT = 10.0
+    DEFAULT_READ_TIMEOUT = 60.0
+    DEFAULT_RETRIES = 3
+    DEFAULT_BACKOFF = 1.0
+    DEFAULT_MAX_BACKOFF = 30.0
+    DEFAULT_FAILURE_THRESHOLD = 5
+    DEFAULT_RESET_TIMEOUT = 60.0
+
+    # Response statuses worth retrying
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, max_backoff=DEFAULT_MAX_BACKOFF,
+                 failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        """
+        Class initialisation
+
+        :param connect_timeout: seconds to wait for connection
+        :param read_timeout: seconds to wait for response data
+        :param retries: number of retries after the first attempt
+        :param backoff: base delay between retries in seconds, doubled with every retry
+        :param max_backoff: maximum delay between retries in seconds
+        :param failure_threshold: consecutive failures after which the circuit opens
+        :param reset_timeout: seconds the circuit stays open before requests are tried again
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._failures = 0
+        self._opened = None
+        self._lock = threading.Lock()
+
+    def is_retryable(self, error):
+        """
+        Check whether request error is transient
+
+        :param error: request exception
+        :rtype: bool
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        if isinstance(error, requests.HTTPError):
+            return error.response is not None and error.response.status_code in self.RETRY_STATUSES
+
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def get_delay(self, attempt):
+        """
+        Get randomised delay before the retry
+
+        :param attempt: number of the failed attempt starting from 0
+        :return: seconds to wait
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def check(self):
+        """
+        Fail fast while the circuit is open
+        """
+        with self._lock:
+            if self._opened is not None and time.monotonic() - self._opened < self.reset_timeout:
+                raise CircuitOpenError('Portal is not responding, requests are paused')
+
+    def record_success(self):
+        """
+        Close the circuit
+        """
+        with self._lock:
+            self._failures = 0
+            self._opened = None
+
+    def record_failure(self):
+        """
+        Count the failure, opening the circuit when there are too many in a row
+        """
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened = time.monotonic()
+
+
+class _Phase:
+    """
+    Timer of a single phase, the measured code may set its size in bytes
+    """
+
+    __slots__ = ('stats', 'name', 'size', 'started')
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+        self.size = 0
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.record(self.name, time.perf_counter() - self.started, self.size)
+
+
+class _NullPhase:
+    """
+    Phase timer used when instrumentation is disabled
+    """
+
+    size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class PhaseStats:
+    """
+    Durations and sizes of scraper work phases: requests, page parsing, json decoding and formatting
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def measure(self, name):
+        """
+        Measure a phase, e.g. with stats.measure('get') as phase: ...; phase.size = len(content)
+
+        :param name: phase name
+        """
+        return _Phase(self, name)
+
+    def record(self, name, duration, size=0):
+        """
+        Record phase duration
+
+        :param name: phase name
+        :param duration: seconds
+        :param size: processed bytes
+        """
+        with self._lock:
+            phase = self.phases.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max': 0.0, 'bytes': 0})
+            phase['calls'] += 1
+            phase['seconds'] += duration
+            phase['max'] = max(phase['max'], duration)
+            phase['bytes'] += size
+
+    def format_table(self):
+        """
+        Format summary table of the recorded phases
+
+        :rtype: str
+        """
+        lines = [f'{"phase":<12} {"calls":>7} {"total s":>9} {"avg ms":>9} {"max ms":>9} {"bytes":>12}']
+
+        with self._lock:
+            for name, phase in self.phases.items():
+                lines.append(
+                    f'{name:<12} {phase["calls"]:>7} {phase["seconds"]:>9.3f} '
+                    f'{phase["seconds"] / phase["calls"] * 1000:>9.2f} {phase["max"] * 1000:>9.2f} '
+                    f'{phase["bytes"]:>12}'
+                )
+
+        return '\n'.join(lines)
+
+
+class Counter:
+    """
+    Prometheus counter with labels
+    """
+
+    kind = 'counter'
+    # Suffix of the metric name in samples and in HELP and TYPE lines
+    suffix = '_total'
+
+    def __init__(self, name, documentation, labels=()):
+        """
+        Class initialisation
+
+        :param name: metric name
+        :param documentation: metric help text
+        :param labels: label names
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        """
+        Get values key of the label values
+        """
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def inc(self, amount=1, **labels):
+        """
+        Increase counter of the label values
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        """
+        Get counter value of the label values
+        """
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        """
+        Get (name suffix, labels, value) samples
+        """
+        with self._lock:
+            return [(self.suffix, dict(zip(self.labels, key)), value)
+                    for key, value in self._values.items()]
+
+
+class Histogram(Counter):
+    """
+    Prometheus histogram with labels
+    """
+
+    kind = 'histogram'
+    suffix = ''
+
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        """
+        Class initialisation
+
+        :param name: metric name
+        :param documentation: metric help text
+        :param labels: label names
+        :param buckets: bucket upper bounds
+        """
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """
+        Add observation of the label values
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-1] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        """
+        Get (name suffix, labels, value) samples
+        """
+        with self._lock:
+            samples = []
+            for key, (counts, total) in self._values.items():
+                labels = dict(zip(self.labels, key))
+                bounds = [f'{bound:g}' for bound in self.buckets] + ['+Inf']
+                for bound, count in zip(bounds, counts):
+                    samples.append(('_bucket', {**labels, 'le': bound}, count))
+                samples.append(('_count', labels, counts[-1]))
+                samples.append(('_sum', labels, total))
+            return samples
+
+
+class Gauge:
+    """
+    Prometheus metric reading its value from a callable when rendered
+    """
+
+    def __init__(self, name, documentation, function, kind='gauge'):
+        """
+        Class initialisation
+
+        :param name: metric name
+        :param documentation: metric help text
+        :param function: callable without arguments returning current value
+        :param kind: gauge or counter, for values that only increase
+        """
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self.kind = kind
+        self.suffix = '_total' if kind == 'counter' else ''
+
+    def samples(self):
+        """
+        Get (name suffix, labels, value) samples
+        """
+        return [(self.suffix, {}, self.function())]
+
+
+class ScraperMetrics:
+    """
+    Metrics registry fed by scrapers, exported in Prometheus text format
+    over http or to a file for node exporter textfile collector
+    """
+
+    def __init__(self, rate_limiter=None):
+        """
+        Class initialisation
+
+        :param rate_limiter: optional rate limiter whose current limits are exported
+        :type rate_limiter: RateLimiter | None
+        """
+        self.requests = Counter('st_requests', 'Portal requests by phase and status',
+                                ('phase', 'status'))
+        self.request_duration = Histogram('st_request_duration_seconds',
+                                          'Portal request duration', ('phase',))
+        self.logins = Counter('st_logins', 'Logins performed')
+        self.session_reuses = Counter('st_session_reuses',
+                                      'Data requests served without logging in')
+        self.cache_requests = Counter('st_cache_requests', 'Response cache lookups', ('result',))
+        self.points = Counter('st_points', 'Data points retrieved by meter', ('meter',))
+        self.fetch_duration = Histogram('st_fetch_duration_seconds',
+                                        'Period data retrieval duration including cache and retries')
+
+        if rate_limiter:
+            self.rate_limit = Gauge('st_rate_limit', 'Current portal request rate limit per second',
+                                    lambda: rate_limiter.get_metrics()['rate'])
+            self.concurrency_limit = Gauge('st_concurrency_limit',
+                                           'Current limit of parallel portal requests',
+                                           lambda: rate_limiter.get_metrics()['concurrency'])
+            self.active_requests = Gauge('st_active_requests', 'Portal requests in progress',
+                                         lambda: rate_limiter.get_metrics()['active'])
+            self.rate_limit_backoffs = Gauge('st_rate_limit_backoffs',
+                                             'Rate and concurrency decreases',
+                                             lambda: rate_limiter.get_metrics()['backoffs'],
+                                             'counter')
+
+    def get_metrics(self):
+        """
+        Get all registered metrics
+        """
+        return [metric for metric in vars(self).values() if isinstance(metric, (Counter, Gauge))]
+
+    def render(self):
+        """
+        Render metrics in Prometheus text exposition format
+
+        :rtype: str
+        """
+        lines = []
+        for metric in self.get_metrics():
+            lines.append(f'# HELP {metric.name}{metric.suffix} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name}{metric.suffix} {metric.kind}')
+            for suffix, labels, value in metric.samples():
+                label_text = ','.join(
+                    f'{name}="{_escape_label(label)}"' for name, label in labels.items()
+                )
+                if label_text:
+                    lines.append(f'{metric.name}{suffix}{{{label_text}}} {value}')
+                else:
+                    lines.append(f'{metric.name}{suffix} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """
+        Write metrics to the file atomically, for node exporter textfile collector
+
+        :param path: output file path
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf8') as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def serve(self, port, host='127.0.0.1'):
+        """
+        Serve metrics over http in a background thread
+
+        :param port: port to listen on
+        :param host: address to listen on
+        :return: running server, call its shutdown() method to stop it
+        :rtype: ThreadingHTTPServer
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                body = metrics.render().encode('utf8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _escape_label(value):
+    """
+    Escape Prometheus label value
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MeterSeries:
+    """
+    Meter data series held in NumPy arrays, requires numpy package.
+    A+ and A- values share one timestamp index, missing values are NaN.
+    """
+
+    # Calendar periods of rollup totals
+    ROLLUP_UNITS = {'day': 'datetime64[D]', 'month': 'datetime64[M]', 'year': 'datetime64[Y]'}
+    # Totals are rounded to Wh like portal values, hiding float summation errors
+    ROLLUP_DECIMALS = 3
+
+    def __init__(self, timestamps, values):
+        """
+        Class initialisation
+
+        :param timestamps: ordered JS timestamps
+        :type timestamps: numpy.ndarray | int64
+        :param values: values by direction (A+ and optionally A-)
+        :type values: dict[str, numpy.ndarray]
+        """
+        self.timestamps = timestamps
+        self.values = values
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __repr__(self):
+        return f'MeterSeries(points={len(self)}, directions={list(self.values)})'
+
+    @staticmethod
+    def _numpy():
+        """
+        Import numpy on first use
+        """
+        numpy = _import_numpy()
+        if numpy is None:
+            raise ImportError('MeterSeries requires numpy package to be installed')
+        return numpy
+
+    @classmethod
+    def from_response(cls, response_data, neto=True):
+        """
+        Parse out the real data from decoded chart
+
+        :param response_data: [timestamps, values] by direction as decoded from chart json
+        :rtype: MeterSeries
+        """
+        np = cls._numpy()
+
+        directions = ['A+']
+        if neto and 'A-' in response_data:
+            directions.append('A-')
+
+        series = {}
+        for direction in directions:
+            timestamps, values = response_data[direction]
+            series[direction] = (
+                np.array(timestamps, np.int64),
+                np.array(values, np.float64)
+            )
+
+        return cls._align(series)
+
+    @classmethod
+    def from_records(cls, data):
+        """
+        Convert the list of dicts format returned by STScraper by default to series
+
+        :param data: data as returned by STScraper.get_<*>_data methods or SQLiteStore.load
+        :rtype: MeterSeries
+        """
+        np = cls._numpy()
+
+        series = {}
+        for direction, items in (data if isinstance(data, dict) else {'A+': data}).items():
+            series[direction] = (
+                np.array([item['data'] for item in items], 'datetime64[ms]').astype(np.int64),
+                np.array([np.nan if item['value'] is None else item['value'] for item in items],
+                         np.float64)
+            )
+
+        return cls._align(series)
+
+    @classmethod
+    def _align(cls, series):
+        """
+        Put series of several directions on one sorted timestamp index, later duplicates win
+
+        :param series: (timestamps, values) arrays by direction
+        :rtype: MeterSeries
+        """
+        np = cls._numpy()
+
+        arrays = list(series.values())
+        timestamps = arrays[0][0]
+        shared = all(np.array_equal(ts, timestamps) for ts, _ in arrays[1:])
+
+        if shared and (len(timestamps) < 2 or np.all(timestamps[1:] > timestamps[:-1])):
+            return cls(timestamps, {direction: vals for direction, (_, vals) in series.items()})
+
+        timestamps = np.unique(np.concatenate([ts for ts, _ in arrays]))
+        values = {}
+        for direction, (ts, vals) in series.items():
+            aligned = np.full(len(timestamps), np.nan)
+            aligned[np.searchsorted(timestamps, ts)] = vals
+            values[direction] = aligned
+
+        return cls(timestamps, values)
+
+    @classmethod
+    def concat(cls, items):
+        """
+        Merge several series into one timestamp ordered series
+
+        :param items: list of MeterSeries
+        :rtype: MeterSeries
+        """
+        np = cls._numpy()
+
+        directions = ['A+']
+        if items and all('A-' in item.values for item in items):
+            directions.append('A-')
+
+        series = {}
+        for direction in directions:
+            series[direction] = (
+                np.concatenate([item.timestamps for item in items] or [np.empty(0, np.int64)]),
+                np.concatenate([item.values[direction] for item in items] or [np.empty(0)])
+            )
+
+        return cls._align(series)
+
+    def select(self, start, end):
+        """
+        Limit series to the days of given range
+
+        :param start: first day of the range
+        :type start: date
+        :param end: last day of the range
+        :type end: date
+        :rtype: MeterSeries
+        """
+        first = int(datetime(start.year, start.month, start.day, tzinfo=timezone.utc).timestamp())
+        last = int(datetime(end.year, end.month, end.day, tzinfo=timezone.utc).timestamp()) + 86400
+
+        mask = (self.timestamps >= first * 1000) & (self.timestamps < last * 1000)
+        return MeterSeries(self.timestamps[mask],
+                           {direction: vals[mask] for direction, vals in self.values.items()})
+
+    def rollup(self, unit):
+        """
+        Aggregate series into totals of calendar days, months or years. Portal timestamps
+        hold local time, so the totals match portal month and year data.
+
+        :param unit: day, month or year
+        :return: totals timestamped with period start, NaN when period has no values
+        :rtype: MeterSeries
+        """
+        np = self._numpy()
+
+        if unit not in self.ROLLUP_UNITS:
+            raise ValueError(f'Invalid rollup unit {unit}')
+
+        if not len(self):
+            return MeterSeries(self.timestamps, dict(self.values))
+
+        periods = self.timestamps.astype('datetime64[ms]').astype(self.ROLLUP_UNITS[unit])
+        periods = periods.astype('datetime64[ms]').astype(np.int64)
+        # Timestamps are ordered, so each period is a contiguous run starting where period changes
+        starts = np.flatnonzero(np.concatenate(([True], periods[1:] != periods[:-1])))
+
+        values = {}
+        for direction, vals in self.values.items():
+            present = ~np.isnan(vals)
+            totals = np.add.reduceat(np.where(present, vals, 0.0), starts)
+            values[direction] = np.where(np.logical_or.reduceat(present, starts),
+                                         np.round(totals, self.ROLLUP_DECIMALS), np.nan)
+
+        return MeterSeries(periods[starts], values)
+
+    def to_records(self):
+        """
+        Convert series to the list of dicts format returned by STScraper by default
+
+        :return: parsed data
+        """
+        dates = STScraper._format_timestamps(self.timestamps.tolist())
+
+        data = {}
+        for direction, vals in self.values.items():
+            data[direction] = [{
+                'data': formatted,
+                'value': None if value != value else value
+            } for formatted, value in zip(dates, vals.tolist())]
+
+        return data if 'A-' in data else data['A+']
 
 
 class STScraper:
     """
-    Smart electricity meter consumption data scraper class for e-st.lv
+    Smart electricity meter consumption data scraper class for e-st.lv
+    """
+
+    BASE_HOST = 'https://mans.e-st.lv'
+    LOGIN_URL = BASE_HOST + '/lv/private/user-authentification/'
+    DATA_URL = BASE_HOST + '/lv/private/paterini-un-norekini/paterinu-grafiki/'
+
+    # Data url parameters
+
+    PERIOD_DAY = 'D'
+    PERIOD_MONTH = 'M'
+    PERIOD_YEAR = 'Y'
+
+    GRANULARITY_HOUR = 'H'
+    GRANULARITY_DAY = 'D'
+
+    # Number of parallel requests used by range data retrieval
+    DEFAULT_WORKERS = 4
+
+    # Time after the period end when portal data are considered final
+    FINAL_DELAY = timedelta(days=2)
+
+    # Number of distinct timestamps from which numpy formatting pays off its import time
+    NUMPY_THRESHOLD = 2000
+
+    # Requests bounced to the login page after another request's login are retried this many
+    # times, as responses to concurrent first requests may replace the logged in session cookie
+    LOGIN_RETRIES = 2
+
+    def __init__(self, login, password, object_id, meter_id, cookie_store=None, session=None,
+                 cache=None, as_series=False, rate_limiter=None, resilience=None, stats=None,
+                 metrics=None, flight=None, planner=None):
+        """
+        Class initialisation
+
+        :param login: username
+        :param password: user password
+        :param meter_id: object EIC ID
+        :param meter_id: smart meter ID
+        :param cookie_store: optional persistent session storage
+        :type cookie_store: CookieStore | None
+        :param session: optional shared session or callable returning it, e.g. of STAccount
+        :type session: requests.Session | callable | None
+        :param cache: optional response cache
+        :type cache: ResponseCache | None
+        :param as_series: return MeterSeries instead of list of dicts
+        :param rate_limiter: optional portal request rate limiter
+        :type rate_limiter: RateLimiter | None
+        :param resilience: timeouts, retries and circuit breaker, defaults to ResiliencePolicy()
+        :type resilience: ResiliencePolicy | None
+        :param stats: optional per-phase timing instrumentation
+        :type stats: PhaseStats | None
+        :param metrics: optional metrics registry
+        :type metrics: ScraperMetrics | None
+        :param flight: coalescing of concurrent identical fetches and logins, shared by scrapers
+                       of the same session, e.g. of STAccount
+        :type flight: SingleFlight | None
+        :param planner: optional planner of range requests with the fewest portal round trips
+        :type planner: RequestPlanner | None
+        """
+        self.login = login
+        self.password = password
+        self.object_id = object_id
+        self.meter_id = meter_id
+        self.cookie_store = cookie_store
+        self.cache = cache
+        self.as_series = as_series
+        self.rate_limiter = rate_limiter
+        self.resilience = resilience or ResiliencePolicy()
+        self.stats = stats
+        self.metrics = metrics
+        self.flight = flight or SingleFlight()
+        self.planner = planner
+
+        # Whether the session has been seen logged in, used to tell login page bounces
+        self._authenticated = False
+
+        # Session is created on first request, as responses may come from cache
+        self._session = session
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        Http session, created on first use
+        """
+        if self._session is None or callable(self._session):
+            with self._session_lock:
+                if self._session is None:
+                    self._session = _create_session(self.cookie_store)
+                elif callable(self._session):
+                    self._session = self._session()
+
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    def _get_current_date(self):
+        """Get the current year, month, and day as a dictionary."""
+        now = datetime.now()
+        return {'year': now.strftime('%Y'), 'month': now.strftime('%m'), 'day': now.strftime('%d')}
+
+    def _get_current_year(self):
+        """
+        Get the current year e.g. 2024
+        """
+        return self._get_current_date()['year']
+
+    def _get_current_month(self):
+        """
+        Get the current month e.g. 02
+        """
+        return self._get_current_date()['month']
+
+    def _get_current_day(self):
+        """
+        Get the current day e.g. 14
+        """
+        return self._get_current_date()['day']
+
+    def _get_data_params(self, period=None, year=None, month=None, day=None, granularity=None):
+        """
+        Prepare normalised data url parameters depending on request type
+
+        :param period: report time period
+        :type period: str | should be one of self.PERIOD_<*>
+        :param year: year
+        :type year: str | None
+        :param month: month
+        :type month: str | None
+        :param day: day
+        :type day: str | None
+        :param granularity: report data type
+        :type granularity: str | should be one of self.GRANULARITY_<*>
+
+        :return: data url parameters
+        :rtype: dict
+        """
+
+        params = {
+            'objectEic': self.object_id,
+            'counterNumber': self.meter_id,
+            'period': period
+        }
+
+        year = f'{int(year or self._get_current_year()):04d}'
+
+        if period == self.PERIOD_YEAR:
+            params['year'] = year
+            if granularity:
+                params['granularity'] = granularity
+
+        if period == self.PERIOD_MONTH:
+            params['year'] = year
+            params['month'] = f'{int(month or self._get_current_month()):02d}'
+            params['granularity'] = granularity
+
+        if period == self.PERIOD_DAY:
+
+            month = f'{int(month or self._get_current_month()):02d}'
+            day = f'{int(day or self._get_current_day()):02d}'
+
+            params['date'] = f'{day}.{month}.{year}'
+            params['granularity'] = granularity
+
+        return params
+
+    def _get_data_url(self, period=None, year=None, month=None, day=None, granularity=None):
+        """
+        Prepare data url depending on request type and parameters
+
+        :param period: report time period
+        :type period: str | should be one of self.PERIOD_<*>
+        :param year: year
+        :type year: str | None
+        :param month: month
+        :type month: str | None
+        :param day: day
+        :type day: str | None
+        :param granularity: report data type
+        :type granularity: str | should be one of self.GRANULARITY_<*>
+
+        :return: generated data url
+        """
+        params = self._get_data_params(period, year, month, day, granularity)
+
+        print(self.DATA_URL + '?' + urlencode(params), file=sys.stderr)
+        return self.DATA_URL + '?' + urlencode(params)
+
+    def _get_period_end(self, params):
+        """
+        Get the last day of the period requested with given data url parameters
+
+        :param params: data url parameters
+        :type params: dict
+        :rtype: date
+        """
+        if params['period'] == self.PERIOD_DAY:
+            day, month, year = params['date'].split('.')
+            return date(int(year), int(month), int(day))
+
+        if params['period'] == self.PERIOD_MONTH:
+            year, month = int(params['year']), int(params['month'])
+            if month == 12:
+                return date(year, 12, 31)
+            return date(year, month + 1, 1) - timedelta(days=1)
+
+        return date(int(params['year']), 12, 31)
+
+    def _is_final(self, params):
+        """
+        Check whether the data of requested period can no longer change
+
+        :param params: data url parameters
+        :type params: dict
+        :rtype: bool
+        """
+        return date.today() - self._get_period_end(params) >= self.FINAL_DELAY
+
+    @staticmethod
+    def _format_timestamp(timestamp):
+        """
+        Convert JS timestamp to human readable date and time
+
+        :param timestamp: timestamp
+        :return: datetime e.g. 2024-02-14 02:00:00
+        :rtype: str
+        """
+        return datetime.fromtimestamp(
+            int(timestamp) / 1000.0, tz=timezone(timedelta(hours=0))
+        ).strftime('%Y-%m-%d %H:%M:%S')
+
+    @staticmethod
+    def _format_timestamps(timestamps):
+        """
+        Convert JS timestamps to human readable date and time in one pass,
+        formatting each distinct timestamp only once
+
+        :param timestamps: list of timestamps
+        :return: list of datetimes e.g. 2024-02-14 02:00:00
+        :rtype: list[str]
+        """
+        distinct = list(dict.fromkeys(int(timestamp) for timestamp in timestamps))
+
+        # Small batches are formatted faster than numpy gets imported
+        numpy = _import_numpy() if len(distinct) >= STScraper.NUMPY_THRESHOLD else None
+
+        if numpy is not None:
+            formatted = numpy.datetime_as_string(numpy.array(distinct, 'datetime64[ms]'), unit='s')
+            formatted = [value.replace('T', ' ') for value in formatted.tolist()]
+        else:
+            formatted = [STScraper._format_timestamp(timestamp) for timestamp in distinct]
+
+        lookup = dict(zip(distinct, formatted))
+        return [lookup[int(timestamp)] for timestamp in timestamps]
+
+    def _format_response(self, response_data, neto=True):
+        """
+        Parse out the real data from decoded chart
+
+        :param response_data: [timestamps, values] by direction
+        :return: parsed data
+        """
+        with self._measure('format'):
+            if self.as_series:
+                data = MeterSeries.from_response(response_data, neto)
+                points = len(data) * len(data.values)
+            else:
+                data = self._format_records(response_data, neto)
+                points = sum(map(len, data.values())) if isinstance(data, dict) else len(data)
+
+        if self.metrics:
+            self.metrics.points.inc(points, meter=self.meter_id)
+
+        return data
+
+    def _format_records(self, response_data, neto=True):
+        """
+        Parse out the real data from decoded chart as lists of dicts
+
+        :param response_data: [timestamps, values] by direction
+        :return: parsed data
+        """
+        cons_timestamps, cons_values = response_data['A+']
+
+        if 'A-' in response_data:
+            neto_timestamps, neto_values = response_data['A-']
+        else:
+            neto = False
+
+        timestamps = cons_timestamps + neto_timestamps if neto else cons_timestamps
+        dates = self._format_timestamps(timestamps)
+
+        cons_data = [{
+            'data': formatted,
+            'value': value
+        } for formatted, value in zip(dates, cons_values)]
+
+        if neto:
+            neto_data = [{
+                'data': formatted,
+                'value': value
+            } for formatted, value in zip(dates[len(cons_timestamps):], neto_values)]
+
+            data = {
+                'A+': cons_data,
+                'A-': neto_data
+            }
+        else:
+            data = cons_data
+
+        return data
+
+    def get_day_data(self, neto=True, year=None, month=None, day=None):
+        """
+        Get the data of the specified day
+
+        :param year:
+        :param month:
+        :param day:
+        :return:
+        """
+        response = self._fetch_remote_data(period=self.PERIOD_DAY, month=month,
+                                           year=year, day=day,
+                                           granularity=self.GRANULARITY_HOUR)
+        return self._format_response(response, neto)
+
+    def get_month_data(self, neto=True, year=None, month=None):
+        """
+        Get the data of the specified month
+
+        :param year:
+        :param month:
+        :return:
+        """
+        response = self._fetch_remote_data(period=self.PERIOD_MONTH, month=month, year=year,
+                                           granularity=self.GRANULARITY_DAY)
+        return self._format_response(response, neto)
+
+    def get_year_data(self, neto=True, year=None):
+        """
+        Get the data of the specified year
+
+        :param year:
+        :return:
+        """
+        response = self._fetch_remote_data(period=self.PERIOD_YEAR, year=year)
+        return self._format_response(response, neto)
+
+    def _plan_range(self, start, end, granularity):
+        """
+        Split date range into data url parameters of the requests covering it
+
+        :param start: first day of the range
+        :type start: date
+        :param end: last day of the range
+        :type end: date
+        :param granularity: report data type
+        :type granularity: str | should be one of self.GRANULARITY_<*>
+        :return: list of self._fetch_remote_data keyword arguments
+        """
+        if self.planner:
+            return self.planner.plan(start, end, granularity, self._fetch_remote_data)
+
+        if start > end:
+            raise ValueError('Range start must not be after range end')
+
+        plan = []
+
+        if granularity == self.GRANULARITY_HOUR:
+            current = start
+            while current <= end:
+                plan.append({
+                    'period': self.PERIOD_DAY,
+                    'year': f'{current.year}',
+                    'month': f'{current.month:02d}',
+                    'day': f'{current.day:02d}',
+                    'granularity': self.GRANULARITY_HOUR
+                })
+                current += timedelta(days=1)
+        elif granularity == self.GRANULARITY_DAY:
+            year, month = start.year, start.month
+            while (year, month) <= (end.year, end.month):
+                plan.append({
+                    'period': self.PERIOD_MONTH,
+                    'year': f'{year}',
+                    'month': f'{month:02d}',
+                    'granularity': self.GRANULARITY_DAY
+                })
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        else:
+            raise ValueError('Invalid granularity specified')
+
+        return plan
+
+    def _fetch_many(self, plan, max_workers=DEFAULT_WORKERS):
+        """
+        Retrieve the data of several requests in parallel over the shared session
+
+        :param plan: list of self._fetch_remote_data keyword arguments
+        :param max_workers: maximum number of parallel requests
+        :return: generator of responses in plan order
+        """
+        if not plan:
+            return
+
+        # First request is done alone so that the session gets authenticated only once
+        yield self._fetch_remote_data(**plan[0])
+
+        # pylint: disable-next=import-outside-toplevel
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            yield from pool.map(lambda kwargs: self._fetch_remote_data(**kwargs), plan[1:])
+
+    def get_range_data(self, start, end, granularity=GRANULARITY_HOUR, neto=True,
+                       max_workers=DEFAULT_WORKERS):
+        """
+        Get the data of the specified date range
+
+        :param start: first day of the range
+        :type start: date
+        :param end: last day of the range
+        :type end: date
+        :param granularity: report data type
+        :type granularity: str | should be one of self.GRANULARITY_<*>
+        :param max_workers: maximum number of parallel requests
+        :return: data of all the range days ordered by timestamp
+        """
+        return self._merge_range(
+            list(self.iter_range_data(start, end, granularity, neto, max_workers)), neto
+        )
+
+    def iter_range_data(self, start, end, granularity=GRANULARITY_HOUR, neto=True,
+                        max_workers=DEFAULT_WORKERS):
+        """
+        Get the data of the specified date range period by period,
+        each period is yielded as soon as it is retrieved
+
+        :param start: first day of the range
+        :type start: date
+        :param end: last day of the range
+        :type end: date
+        :param granularity: report data type
+        :type granularity: str | should be one of self.GRANULARITY_<*>
+        :param max_workers: maximum number of parallel requests
+        :return: generator of period data in timestamp order
+        """
+        plan = self._plan_range(start, end, granularity)
+
+        for response in self._fetch_many(plan, max_workers):
+            yield self._select_range(self._format_response(response, neto), start, end)
+
+    @staticmethod
+    def _select_range(data, start, end):
+        """
+        Limit parsed data to the range days
+
+        :param data: parsed data
+        :param start: first day of the range
+        :type start: date
+        :param end: last day of the range
+        :type end: date
+        :return: parsed data limited to the range days
+        """
+        if isinstance(data, MeterSeries):
+            return data.select(start, end)
+
+        first, last = start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+        def select(items):
+            return [item for item in items if first <= item['data'][:10] <= last]
+
+        if isinstance(data, dict):
+            return {direction: select(items) for direction, items in data.items()}
+
+        return select(data)
+
+    def _merge_range(self, pieces, neto=True):
+        """
+        Merge range period data into a single timestamp ordered result
+
+        :param pieces: parsed data of range periods
+        :return: merged data
+        """
+        if self.as_series:
+            return MeterSeries.concat(pieces)
+
+        cons_data, neto_data = [], []
+
+        for data in pieces:
+            if isinstance(data, dict):
+                cons_data += data['A+']
+                neto_data += data['A-']
+            else:
+                cons_data += data
+
+        if neto:
+            return {
+                'A+': sorted(cons_data, key=lambda item: item['data']),
+                'A-': sorted(neto_data, key=lambda item: item['data'])
+            }
+
+        return sorted(cons_data, key=lambda item: item['data'])
+
+    def _fetch_remote_data(self, **kwargs):
+        """
+        Retrieve the data from cache or portal. Concurrent requests of the same data
+        share a single retrieval and its result.
+
+        :param kwargs:
+        :return:
+        """
+        started = time.monotonic()
+        params = self._get_data_params(**kwargs)
+        key = urlencode(sorted(params.items()))
+
+        data = self.flight.do(key, lambda: self._fetch_cached_data(key, params, **kwargs))
+
+        if self.metrics:
+            self.metrics.fetch_duration.observe(time.monotonic() - started)
+
+        return data
+
+    def _fetch_cached_data(self, key, params, **kwargs):
+        """
+        Retrieve the data from cache, falling back to portal
+
+        :param key: cache key
+        :param params: normalised data url parameters
+        :param kwargs:
+        :return:
+        """
+        if not self.cache:
+            return self._fetch_portal_data(**kwargs)
+
+        data = self.cache.get(key)
+        if self.metrics:
+            self.metrics.cache_requests.inc(result='miss' if data is None else 'hit')
+
+        if data is not None and 'values' in data:
+            # Entry cached as graph json by an earlier version
+            data = _chart_columns(data)
+
+        if data is None:
+            data = self._fetch_portal_data(**kwargs)
+            self.cache.set(key, data, self._is_final(params))
+
+        return data
+
+    def _fetch_portal_data(self, **kwargs):
+        """
+        Retrieve the data, retrying transient failures
+
+        :param kwargs:
+        :return:
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        attempt = 0
+
+        while True:
+            self.resilience.check()
+
+            try:
+                data = self._fetch_portal_page(**kwargs)
+            except requests.RequestException as e:
+                if not self.resilience.is_retryable(e):
+                    raise
+
+                self.resilience.record_failure()
+                if attempt >= self.resilience.retries:
+                    raise
+
+                time.sleep(self.resilience.get_delay(attempt))
+                attempt += 1
+                continue
+
+            self.resilience.record_success()
+            return data
+
+    def _fetch_portal_page(self, **kwargs):
+        """
+        Retrieve the data, doing authentification only when the session is not logged in.
+        Concurrent requests bounced to the login page share a single login.
+
+        :param kwargs:
+        :return:
+        """
+        url = self._get_data_url(**kwargs)
+
+        if self._authenticated:
+            values = self._get_page_values(url)
+        else:
+            # Concurrent first requests would each start a new portal session and the session
+            # would keep the cookie of whichever response came last, so they wait for the first one
+            caller = object()
+            leader, values = self.flight.do(('first', id(self.session)),
+                                            lambda: (caller, self._get_page_values(url)))
+            if leader is not caller:
+                values = self._get_page_values(url)
+
+        with self._measure('decode') as phase:
+            phase.size = len(values)
+            return self._decode_chart(values)
+
+    def _get_page_values(self, url):
+        """
+        Request data page and extract chart json, logging in when bounced to the login page
+
+        :param url: data url
+        :return: chart json
+        :rtype: str
+        """
+        login_key = ('login', id(self.session))
+
+        for attempt in range(self.LOGIN_RETRIES + 1):
+            with self._measure('get') as phase:
+                response = self._request('get', url)
+                phase.size = len(response.content)
+
+            with self._measure('chart_parse') as phase:
+                values = self._get_chart_values(response.text)
+                phase.size = len(response.text)
+
+            if values is not None:
+                if attempt == 0:
+                    if self.metrics:
+                        self.metrics.session_reuses.inc()
+                    if self.cookie_store:
+                        self.cookie_store.touch(self.session)
+                break
+
+            if attempt == 0 and self._authenticated and self.rate_limiter:
+                self.rate_limiter.backoff()
+
+            text = self._login_once(url, login_key)
+            if text is None:
+                # Session has been logged in by another request, retry with it
+                continue
+
+            with self._measure('chart_parse') as phase:
+                values = self._get_chart_values(text)
+                phase.size = len(text)
+
+            if values is None:
+                raise LoginError('Unable to retrieve data, check login credentials')
+
+            if self.cookie_store:
+                self.cookie_store.save(self.session)
+            break
+        else:
+            raise LoginError('Unable to retrieve data, check login credentials')
+
+        self._authenticated = True
+        return values
+
+    def _login_once(self, url, login_key):
+        """
+        Log in unless the session is logged in already, concurrent callers share a single login
+
+        :param url: data url to return to after login
+        :param login_key: single flight key of session logins
+        :return: data page html or None when the login has been done by another request
+        :rtype: str | None
+        """
+        def login():
+            # Concurrent requests may have replaced the session cookie or logged in since
+            # the bounced request, so the page is requested again to post the token of
+            # the current cookie, or to find the session logged in already
+            with self._measure('get') as phase:
+                text = self._request('get', url).text
+                phase.size = len(text)
+
+            with self._measure('chart_parse') as phase:
+                logged_in = self._get_chart_values(text) is not None
+                phase.size = len(text)
+
+            return text if logged_in else self._login(text)
+
+        caller = object()
+        leader, text = self.flight.do(login_key, lambda: (caller, login()))
+
+        return text if leader is caller else None
+
+    def _measure(self, name):
+        """
+        Measure scraper work phase when instrumentation is enabled
+
+        :param name: phase name
+        """
+        return self.stats.measure(name) if self.stats else _NULL_PHASE
+
+    def _request(self, method, url, **kwargs):
+        """
+        Do session request, through rate limiter when it is set
+
+        :param method: get or post
+        :param url: request url
+        :param kwargs: request arguments
+        :rtype: requests.Response
+        """
+        kwargs.setdefault('timeout', self.resilience.timeout)
+
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+
+        started = time.monotonic()
+        status_code = None
+
+        try:
+            response = getattr(self.session, method)(url, **kwargs)
+            status_code = response.status_code
+        finally:
+            duration = time.monotonic() - started
+
+            if self.rate_limiter:
+                self.rate_limiter.release(duration, status_code)
+
+            if self.planner:
+                self.planner.observe(duration)
+
+            if self.metrics:
+                phase = 'login' if url == self.LOGIN_URL else 'data'
+                self.metrics.requests.inc(phase=phase, status=status_code or 'error')
+                self.metrics.request_duration.observe(duration, phase=phase)
+
+        response.raise_for_status()
+        return response
+
+    def _decode_chart(self, values):
+        """
+        Decode chart json into timestamp and value columns. Dicts of data points are
+        dropped right after decoding, so they are not kept while the output is built.
+
+        :param values: chart json
+        :return: [timestamps, values] by direction
+        :rtype: dict
+        """
+        return _chart_columns(json.loads(values))
+
+    @staticmethod
+    def _get_chart_values(text):
+        """
+        Extract chart json from the page, falling back to full page parsing
+        when the targeted scanner does not find it
+
+        :param text: page html
+        :return: chart json or None when page has no chart, e.g. login page
+        :rtype: str | None
+        """
+        values = _scan_chart_values(text)
+
+        if values is None and 'data-values' in text:
+            from pyquery import PyQuery  # pylint: disable=import-outside-toplevel
+
+            values = PyQuery(text)('div.chart').attr('data-values')
+
+        return values
+
+    def _get_login_values(self, text):
+        """
+        Prepare login form values found on the given page
+
+        :param text: login page html
+        :return: login form data
+        :rtype: dict
+        """
+        fields = (
+            '_token',
+            'returnUrl',
+            'login',
+            'password'
+        )
+
+        values = _scan_input_values(text, fields)
+
+        if values.get('_token') is None:
+            from pyquery import PyQuery  # pylint: disable=import-outside-toplevel
+
+            root = PyQuery(text)
+            for field in fields:
+                values[field] = root(f'input[name={field}]').attr('value')
+
+        values['login'] = self.login
+        values['password'] = self.password
+
+        return values
+
+    def _login(self, text):
+        """
+        Submit the login form found on the given page
+
+        :param text: login page html
+        :return: html of the page the portal redirects to after login
+        :rtype: str
+        """
+        with self._measure('login_parse') as phase:
+            values = self._get_login_values(text)
+            phase.size = len(text)
+
+        with self._measure('login_post') as phase:
+            response = self._request('post', self.LOGIN_URL, data=values)
+            phase.size = len(response.content)
+
+        if self.metrics:
+            self.metrics.logins.inc()
+
+        return response.text
+
+
+class RequestPlanner:
+    """
+    Plans data url requests covering a date range with the fewest portal round trips,
+    using the longest periods the portal returns in the requested granularity, e.g. one
+    month of hourly data instead of 31 days. Whether the portal supports a period and
+    granularity combination is probed once with a real request and remembered.
+    """
+
+    # Periods tried for each granularity, longest first. The last one is always supported.
+    LAYOUTS = {
+        STScraper.GRANULARITY_HOUR: (STScraper.PERIOD_YEAR, STScraper.PERIOD_MONTH,
+                                     STScraper.PERIOD_DAY),
+        STScraper.GRANULARITY_DAY: (STScraper.PERIOD_YEAR, STScraper.PERIOD_MONTH)
+    }
+
+    # Data points of each granularity are at most this many milliseconds apart
+    STEPS = {
+        STScraper.GRANULARITY_HOUR: 60 * 60 * 1000,
+        STScraper.GRANULARITY_DAY: 24 * 60 * 60 * 1000
+    }
+
+    # Seconds per request assumed by estimates before any request is measured
+    DEFAULT_REQUEST_TIME = 1.0
+    # Weight of the latest request duration in the moving average
+    SMOOTHING = 0.2
+
+    def __init__(self, path=None):
+        """
+        Class initialisation
+
+        :param path: optional file keeping probed combinations and request time between runs
+        """
+        self.path = path
+        self.supported = {}
+        self.request_time = self.DEFAULT_REQUEST_TIME
+        self._lock = threading.Lock()
+
+        if path:
+            try:
+                with open(path, encoding='utf8') as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                stored = {}
+
+            self.supported = stored.get('supported', {})
+            self.request_time = stored.get('request_time', self.DEFAULT_REQUEST_TIME)
+
+    def save(self):
+        """
+        Save probed combinations and request time, replacing the stored file atomically
+        """
+        if not self.path:
+            return
+
+        with self._lock:
+            stored = {'supported': dict(self.supported), 'request_time': self.request_time}
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf8') as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def observe(self, duration):
+        """
+        Record portal request duration
+
+        :param duration: request duration in seconds
+        """
+        with self._lock:
+            self.request_time += self.SMOOTHING * (duration - self.request_time)
+
+    def is_supported(self, period, granularity):
+        """
+        Check whether the portal returns data of the period in the granularity
+
+        :param period: report time period
+        :param granularity: report data type
+        :return: whether supported or None when not probed yet
+        :rtype: bool | None
+        """
+        if period == self.LAYOUTS[granularity][-1]:
+            return True
+
+        with self._lock:
+            return self.supported.get(f'{period}:{granularity}')
+
+    def plan(self, start, end, granularity, fetch=None):
+        """
+        Split date range into data url parameters of the fewest requests covering it.
+        Longer periods are used only where they save requests, so that no more data
+        than needed are transferred.
+
+        :param start: first day of the range
+        :type start: date
+        :param end: last day of the range
+        :type end: date
+        :param granularity: report data type
+        :type granularity: str | should be one of STScraper.GRANULARITY_<*>
+        :param fetch: callable retrieving data of given data url parameters used to probe
+                      unknown combinations, e.g. STScraper._fetch_remote_data. Without it
+                      unknown combinations are not used, e.g. for a dry run.
+        :return: list of STScraper._fetch_remote_data keyword arguments
+        """
+        if start > end:
+            raise ValueError('Range start must not be after range end')
+
+        if granularity not in self.LAYOUTS:
+            raise ValueError('Invalid granularity specified')
+
+        periods = []
+        for period in self.LAYOUTS[granularity]:
+            supported = self.is_supported(period, granularity)
+            if supported is None and fetch:
+                supported = self._probe(period, granularity, start, fetch)
+            if supported:
+                periods.append(period)
+
+        return self._cover(start, end, granularity, periods)
+
+    def _probe(self, period, granularity, day, fetch):
+        """
+        Request data of the period containing given day and check their granularity
+
+        :return: whether supported or None when response has too few points to tell
+        :rtype: bool | None
+        """
+        import requests  # pylint: disable=import-outside-toplevel
+
+        key = f'{period}:{granularity}'
+
+        try:
+            response = fetch(**self._get_params(period, day, granularity))
+        except requests.HTTPError as e:
+            if e.response is None or not 400 <= e.response.status_code < 500:
+                raise
+            supported = False
+        else:
+            timestamps = sorted({int(timestamp) for timestamp in response.get('A+', [[]])[0]})
+            if len(timestamps) < 2:
+                return None
+
+            steps = (later - earlier for earlier, later in zip(timestamps, timestamps[1:]))
+            supported = min(steps) <= self.STEPS[granularity]
+
+        with self._lock:
+            self.supported[key] = supported
+        self.save()
+
+        return supported
+
+    def _cover(self, start, end, granularity, periods):
+        """
+        Cover date range with requests of the periods, longest first
+
+        :param periods: supported periods, longest first
+        :return: list of STScraper._fetch_remote_data keyword arguments
+        """
+        period, shorter = periods[0], periods[1:]
+        plan = []
+
+        first = start
+        while first <= end:
+            last = min(self._get_period_end(period, first), end)
+
+            if shorter:
+                parts = self._cover(first, last, granularity, shorter)
+                plan += parts if len(parts) == 1 else [self._get_params(period, first, granularity)]
+            else:
+                plan.append(self._get_params(period, first, granularity))
+
+            first = last + timedelta(days=1)
+
+        return plan
+
+    @staticmethod
+    def _get_period_end(period, day):
+        """
+        Get the last day of the period containing given day
+
+        :rtype: date
+        """
+        if period == STScraper.PERIOD_DAY:
+            return day
+
+        if period == STScraper.PERIOD_MONTH:
+            if day.month == 12:
+                return date(day.year, 12, 31)
+            return date(day.year, day.month + 1, 1) - timedelta(days=1)
+
+        return date(day.year, 12, 31)
+
+    @staticmethod
+    def _get_params(period, day, granularity):
+        """
+        Prepare STScraper._fetch_remote_data keyword arguments of the period containing given day
+
+        :rtype: dict
+        """
+        params = {'period': period, 'year': f'{day.year}'}
+
+        if period in (STScraper.PERIOD_MONTH, STScraper.PERIOD_DAY):
+            params['month'] = f'{day.month:02d}'
+
+        if period == STScraper.PERIOD_DAY:
+            params['day'] = f'{day.day:02d}'
+
+        params['granularity'] = granularity
+        return params
+
+    def estimate(self, requests_count, max_workers=STScraper.DEFAULT_WORKERS, rate=None):
+        """
+        Estimate time of retrieving data with given number of requests
+
+        :param requests_count: number of requests
+        :param max_workers: maximum number of parallel requests
+        :param rate: optional rate limit in requests per second
+        :return: seconds
+        :rtype: float
+        """
+        if not requests_count:
+            return 0.0
+
+        # First request is done alone, the rest in parallel
+        seconds = self.request_time * (1 + -(-(requests_count - 1) // max_workers))
+
+        if rate:
+            seconds = max(seconds, requests_count / rate)
+
+        return seconds
+
+
+class STAccount:
+    """
+    Account level client retrieving data of several meters over a single logged in session
     """
 
-    BASE_HOST = 'https://mans.e-st.lv'
-    LOGIN_URL = BASE_HOST + '/lv/private/user-authentification/'
-    DATA_URL = BASE_HOST + '/lv/private/paterini-un-norekini/paterinu-grafiki/'
+    def __init__(self, login, password, cookie_store=None, cache=None, as_series=False,
+                 rate_limiter=None, resilience=None, stats=None, metrics=None, planner=None):
+        """
+        Class initialisation
+
+        :param login: username
+        :param password: user password
+        :param cookie_store: optional persistent session storage
+        :type cookie_store: CookieStore | None
+        :param cache: optional response cache
+        :type cache: ResponseCache | None
+        :param as_series: return MeterSeries instead of list of dicts
+        :param rate_limiter: optional portal request rate limiter
+        :type rate_limiter: RateLimiter | None
+        :param resilience: timeouts, retries and circuit breaker shared by all meters
+        :type resilience: ResiliencePolicy | None
+        :param stats: optional per-phase timing instrumentation
+        :type stats: PhaseStats | None
+        :param metrics: optional metrics registry
+        :type metrics: ScraperMetrics | None
+        :param planner: optional planner of range requests shared by all meters
+        :type planner: RequestPlanner | None
+        """
+        self.login = login
+        self.password = password
+        self.cookie_store = cookie_store
+        self.cache = cache
+        self.as_series = as_series
+        self.rate_limiter = rate_limiter
+        self.resilience = resilience or ResiliencePolicy()
+        self.stats = stats
+        self.metrics = metrics
+        self.planner = planner
+        self.flight = SingleFlight()
+
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        Http session shared by all meters, created on first use
+        """
+        with self._session_lock:
+            if self._session is None:
+                self._session = _create_session(self.cookie_store)
+
+        return self._session
+
+    def get_scraper(self, object_id, meter_id):
+        """
+        Get scraper of a single meter sharing the account session
+
+        :param object_id: object EIC ID
+        :param meter_id: smart meter ID
+        :rtype: STScraper
+        """
+        return STScraper(self.login, self.password, object_id, meter_id,
+                         self.cookie_store, lambda: self.session, self.cache, self.as_series,
+                         self.rate_limiter, self.resilience, self.stats, self.metrics, self.flight,
+                         self.planner)
+
+    @staticmethod
+    def meter_keys(meters):
+        """
+        Get output keys of meters: smart meter ID, or objectid:meter when several
+        objects have the same meter ID
+
+        :param meters: list of (object EIC ID, smart meter ID) pairs
+        :return: keys in the order of meters
+        :rtype: list[str]
+        """
+        objects = {}
+        for object_id, meter_id in meters:
+            objects.setdefault(meter_id, set()).add(object_id)
+
+        return [meter_id if len(objects[meter_id]) == 1 else f'{object_id}:{meter_id}'
+                for object_id, meter_id in meters]
+
+    def get_meters_data(self, meters, fetch, max_workers=STScraper.DEFAULT_WORKERS):
+        """
+        Get the data of several meters in parallel
+
+        :param meters: list of (object EIC ID, smart meter ID) pairs
+        :param fetch: callable retrieving the data from given meter scraper,
+                      e.g. lambda scraper: scraper.get_month_data(year='2024', month='02')
+        :param max_workers: maximum number of parallel requests
+        :return: data by smart meter ID, or by objectid:meter when several objects have
+                 the same meter ID
+        :rtype: dict
+        """
+        scrapers = [self.get_scraper(object_id, meter_id) for object_id, meter_id in meters]
+
+        if not scrapers:
+            return {}
+
+        # First meter is done alone so that the session gets authenticated only once
+        results = [fetch(scrapers[0])]
+
+        # pylint: disable-next=import-outside-toplevel
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results += pool.map(fetch, scrapers[1:])
+
+        return dict(zip(self.meter_keys(meters), results))
+
+
+class AsyncSTScraper(STScraper):
+    """
+    Asyncio counterpart of STScraper, requires httpx package
+    """
+
+    def __init__(self, login, password, object_id, meter_id, client=None, as_series=False,
+                 resilience=None):
+        """
+        Class initialisation
+
+        :param login: username
+        :param password: user password
+        :param meter_id: object EIC ID
+        :param meter_id: smart meter ID
+        :param client: optional shared client, e.g. to reuse a logged in session across meters
+        :type client: httpx.AsyncClient | None
+        :param as_series: return MeterSeries instead of list of dicts
+        :param resilience: request timeouts, defaults to ResiliencePolicy()
+        :type resilience: ResiliencePolicy | None
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        try:
+            import httpx  # pylint: disable=import-outside-toplevel
+        except ImportError as e:
+            raise ImportError('AsyncSTScraper requires httpx package to be installed') from e
+
+        super().__init__(login, password, object_id, meter_id, as_series=as_series,
+                         resilience=resilience)
+
+        connect_timeout, read_timeout = self.resilience.timeout
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.session = client or httpx.AsyncClient(follow_redirects=True, timeout=self._timeout)
+        self._login_lock = asyncio.Lock()
+        self._first_lock = asyncio.Lock()
+        # In flight fetch tasks by data url parameters
+        self._fetches = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """
+        Close underlying http client
+        """
+        await self.session.aclose()
+
+    async def get_day_data(self, neto=True, year=None, month=None, day=None):
+        """
+        Get the data of the specified day
+
+        :param year:
+        :param month:
+        :param day:
+        :return:
+        """
+        response = await self._fetch_remote_data(period=self.PERIOD_DAY, month=month,
+                                                 year=year, day=day,
+                                                 granularity=self.GRANULARITY_HOUR)
+        return self._format_response(response, neto)
+
+    async def get_month_data(self, neto=True, year=None, month=None):
+        """
+        Get the data of the specified month
+
+        :param year:
+        :param month:
+        :return:
+        """
+        response = await self._fetch_remote_data(period=self.PERIOD_MONTH, month=month, year=year,
+                                                 granularity=self.GRANULARITY_DAY)
+        return self._format_response(response, neto)
+
+    async def get_year_data(self, neto=True, year=None):
+        """
+        Get the data of the specified year
+
+        :param year:
+        :return:
+        """
+        response = await self._fetch_remote_data(period=self.PERIOD_YEAR, year=year)
+        return self._format_response(response, neto)
+
+    async def get_range_data(self, start, end, granularity=STScraper.GRANULARITY_HOUR, neto=True,
+                             max_workers=STScraper.DEFAULT_WORKERS):
+        """
+        Get the data of the specified date range
+
+        :param start: first day of the range
+        :type start: date
+        :param end: last day of the range
+        :type end: date
+        :param granularity: report data type
+        :type granularity: str | should be one of self.GRANULARITY_<*>
+        :param max_workers: maximum number of parallel requests
+        :return: data of all the range days ordered by timestamp
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        plan = self._plan_range(start, end, granularity)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def fetch(kwargs):
+            async with semaphore:
+                return await self._fetch_remote_data(**kwargs)
+
+        if not plan:
+            return self._merge_range([], neto)
+
+        # First request is done alone so that the session gets authenticated only once
+        responses = [await self._fetch_remote_data(**plan[0])]
+        responses += await asyncio.gather(*(fetch(kwargs) for kwargs in plan[1:]))
+        return self._merge_range(
+            [self._select_range(self._format_response(response, neto), start, end)
+             for response in responses], neto
+        )
+
+    async def _request(self, method, url, **kwargs):
+        """
+        Do client request with policy timeouts, also when the client is shared
+
+        :param method: get or post
+        :param url: request url
+        :param kwargs: request arguments
+        :rtype: httpx.Response
+        :raises httpx.HTTPStatusError: on error response status
+        """
+        kwargs.setdefault('timeout', self._timeout)
+
+        response = await getattr(self.session, method)(url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    async def _fetch_remote_data(self, **kwargs):
+        """
+        Retrieve the data. Concurrent requests of the same data share a single fetch and its result.
+
+        :param kwargs:
+        :return:
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        key = urlencode(sorted(self._get_data_params(**kwargs).items()))
+        task = self._fetches.get(key)
+
+        if task is None:
+            task = self._fetches[key] = asyncio.ensure_future(self._fetch_portal_data(**kwargs))
+            task.add_done_callback(lambda _: self._fetches.pop(key, None))
+
+        # Shielded so that a cancelled caller does not cancel the fetch of the others
+        return await asyncio.shield(task)
+
+    async def _fetch_portal_data(self, **kwargs):
+        """
+        Retrieve the data, doing authentification only when the session is not logged in.
+        Concurrent requests bounced to the login page share a single login.
+
+        :param kwargs:
+        :return:
+        """
+        url = self._get_data_url(**kwargs)
+
+        if self._authenticated:
+            values = await self._get_page_values(url)
+        else:
+            # Concurrent first requests would each start a new portal session and the session
+            # would keep the cookie of whichever response came last, so they wait for the first one
+            async with self._first_lock:
+                first = not self._authenticated
+                if first:
+                    values = await self._get_page_values(url)
+
+            if not first:
+                values = await self._get_page_values(url)
+
+        return self._decode_chart(values)
+
+    async def _get_page_values(self, url):
+        """
+        Request data page and extract chart json, logging in when bounced to the login page
+
+        :param url: data url
+        :return: chart json
+        :rtype: str
+        """
+        response = await self._request('get', url)
+        values = self._get_chart_values(response.text)
+
+        if values is None:
+            async with self._login_lock:
+                # Someone else may have logged in meanwhile, and concurrent requests of a fresh
+                # session replace each other's session cookie, so the page is requested again
+                # to get the login form token matching the current cookie
+                response = await self._request('get', url)
+                values = self._get_chart_values(response.text)
+
+                if values is None:
+                    response = await self._request('post', self.LOGIN_URL,
+                                                   data=self._get_login_values(response.text))
+                    values = self._get_chart_values(response.text)
+
+        if values is None:
+            raise LoginError('Unable to retrieve data, check login credentials')
+
+        self._authenticated = True
+        return values
+
+
+class SQLiteStore:
+    """
+    SQLite storage of meter data series with incremental synchronisation.
+    Rows are keyed by object and meter, as meters of different objects may have the same ID.
+    """
+
+    # Granularity of year data points
+    GRANULARITY_MONTH = 'M'
+
+    def __init__(self, path):
+        """
+        Class initialisation
+
+        :param path: database file path
+        """
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self.connection:
+            columns = [row[1] for row in self.connection.execute('PRAGMA table_info(readings)')]
+            if columns and 'object' not in columns:
+                # Rows of databases created before objects were stored are kept with empty object ID
+                self.connection.execute('ALTER TABLE readings RENAME TO readings_old')
+
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS readings ('
+                'object TEXT NOT NULL, '
+                'meter TEXT NOT NULL, '
+                'granularity TEXT NOT NULL, '
+                'direction TEXT NOT NULL, '
+                'timestamp TEXT NOT NULL, '
+                'value REAL, '
+                'PRIMARY KEY (object, meter, granularity, direction, timestamp)'
+                ') WITHOUT ROWID'
+            )
+
+            if columns and 'object' not in columns:
+                self.connection.execute("INSERT INTO readings SELECT '', * FROM readings_old")
+                self.connection.execute('DROP TABLE readings_old')
+
+    def close(self):
+        """
+        Close database connection
+        """
+        self.connection.close()
+
+    def save(self, meter_id, data, granularity, object_id=''):
+        """
+        Store meter data, replacing already stored values of the same timestamps
+
+        :param meter_id: smart meter ID
+        :param data: data as returned by STScraper.get_<*>_data methods
+        :type data: list | dict | MeterSeries
+        :param granularity: data granularity
+        :type granularity: str | should be one of STScraper.GRANULARITY_<*> or self.GRANULARITY_MONTH
+        :param object_id: object EIC ID of the meter
+        :return: number of stored values
+        :rtype: int
+        """
+        rows = [
+            (object_id, meter, granularity, direction, timestamp, value)
+            for meter, direction, timestamp, value in _iter_readings(data, meter_id)
+        ]
+
+        with self._lock, self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO readings VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+        return len(rows)
+
+    def load(self, meter_id, granularity, neto=True, start=None, end=None, object_id=None):
+        """
+        Load stored meter data
+
+        :param meter_id: smart meter ID
+        :param granularity: data granularity
+        :param start: first day to load
+        :type start: date | None
+        :param end: last day to load
+        :type end: date | None
+        :param object_id: object EIC ID of the meter, data of any object when not set
+        :type object_id: str | None
+        :return: data in the same format as STScraper.get_<*>_data methods
+        """
+        query = 'SELECT direction, timestamp, value FROM readings WHERE meter = ? AND granularity = ?'
+        args = [meter_id, granularity]
+
+        if object_id is not None:
+            query += ' AND object = ?'
+            args.append(object_id)
+
+        if start:
+            query += ' AND timestamp >= ?'
+            args.append(start.strftime('%Y-%m-%d'))
+
+        if end:
+            query += ' AND timestamp < ?'
+            args.append((end + timedelta(days=1)).strftime('%Y-%m-%d'))
+
+        series = {'A+': [], 'A-': []}
+
+        with self._lock:
+            rows = self.connection.execute(query + ' ORDER BY timestamp', args).fetchall()
+
+        for direction, timestamp, value in rows:
+            series[direction].append({'data': timestamp, 'value': value})
+
+        return series if neto else series['A+']
+
+    def rollup(self, meter_id, unit, neto=True, start=None, end=None,
+               granularity=STScraper.GRANULARITY_HOUR, object_id=None):
+        """
+        Aggregate stored data into totals of calendar days, months or years without
+        portal requests, requires numpy package
+
+        :param meter_id: smart meter ID
+        :param unit: day, month or year
+        :param start: first day to aggregate, periods cut by it get partial totals
+        :type start: date | None
+        :param end: last day to aggregate
+        :type end: date | None
+        :param granularity: granularity of aggregated stored data
+        :param object_id: object EIC ID of the meter, data of any object when not set
+        :type object_id: str | None
+        :return: totals in the same format as STScraper.get_<*>_data methods
+        """
+        data = self.load(meter_id, granularity, neto, start, end, object_id)
+
+        if neto and data['A+'] and not data['A-']:
+            # Meters without A- data get A+ totals only, like portal data of such meters
+            data = data['A+']
+
+        return rollup(data, unit)
+
+    def get_last_timestamp(self, meter_id, granularity, object_id=''):
+        """
+        Get the latest stored timestamp of meter data
+
+        :param meter_id: smart meter ID
+        :param granularity: data granularity
+        :param object_id: object EIC ID of the meter
+        :return: timestamp e.g. 2024-02-14 02:00:00 or None when nothing is stored
+        :rtype: str | None
+        """
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT MAX(timestamp) FROM readings WHERE object = ? AND meter = ? AND granularity = ?',
+                (object_id, meter_id, granularity)
+            ).fetchone()
+
+        return row[0]
+
+    def sync(self, scraper, granularity=STScraper.GRANULARITY_HOUR, start=None, neto=True,
+             max_workers=STScraper.DEFAULT_WORKERS):
+        """
+        Fetch and store only the data missing since the latest stored timestamp
+
+        :param scraper: scraper of the meter to synchronise
+        :type scraper: STScraper
+        :param granularity: data granularity
+        :type granularity: str | should be one of STScraper.GRANULARITY_<*>
+        :param start: first day to fetch when nothing is stored yet
+        :type start: date | None
+        :param max_workers: maximum number of parallel requests
+        :return: fetched data
+        """
+        last = self.get_last_timestamp(scraper.meter_id, granularity, scraper.object_id)
+
+        if last:
+            # The last stored day may have been incomplete, so it is fetched again
+            start = date.fromisoformat(last[:10])
+        elif not start:
+            raise TypeError('Sync start must be set when nothing is stored yet')
+
+        data = scraper.get_range_data(start, date.today(), granularity, neto, max_workers)
+        self.save(scraper.meter_id, data, granularity, scraper.object_id)
+
+        return data
+
+
+class MeterArchive:
+    """
+    Compact binary file of meter data series for long-term history, requires numpy package.
+    Timestamps are delta encoded and values kept as integer Wh in separate A+ and A- columns,
+    split into blocks optionally compressed with zstd. Files are memory mapped for reading,
+    so range scans decode only the blocks they overlap.
+    """
 
-    # Data url parameters
+    MAGIC = b'STMA'
+    VERSION = 1
+    FLAG_ZSTD = 1
+    FLAG_NETO = 2
 
-    PERIOD_DAY = 'D'
-    PERIOD_MONTH = 'M'
-    PERIOD_YEAR = 'Y'
+    # Magic, version, flags, number of blocks and number of points
+    HEADER = struct.Struct('<4sBBxxIQ')
+    # First and last timestamp, payload offset and size and number of points of each block
+    BLOCK = struct.Struct('<qqQII')
 
-    GRANULARITY_HOUR = 'H'
-    GRANULARITY_DAY = 'D'
+    # Points per block, a leap year of hourly data
+    BLOCK_SIZE = 366 * 24
+    # Values are stored in Wh
+    SCALE = 1000
+    # Stored in place of missing values
+    MISSING = -2 ** 31
+    ZSTD_LEVEL = 9
 
-    def __init__(self, login, password, object_id, meter_id):
+    def __init__(self, path):
         """
-        Class initialisation
+        Open archive file for reading
 
-        :param login: username
-        :param password: user password
-        :param meter_id: object EIC ID
-        :param meter_id: smart meter ID
+        :param path: archive file path
         """
-        self.login = login
-        self.password = password
-        self.object_id = object_id
-        self.meter_id = meter_id
+        self._numpy()
+        self.path = path
 
-        self.session = requests.Session()
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-    def _get_current_date(self):
-        """Get the current year, month, and day as a dictionary."""
-        now = datetime.now()
-        return {'year': now.strftime('%Y'), 'month': now.strftime('%m'), 'day': now.strftime('%d')}
+        try:
+            magic, version, flags, blocks, self.points = self.HEADER.unpack_from(self._map)
+            if magic != self.MAGIC or version != self.VERSION:
+                raise ValueError(f'{path} is not a meter archive')
 
-    def _get_current_year(self):
+            self._blocks = [
+                self.BLOCK.unpack_from(self._map, self.HEADER.size + index * self.BLOCK.size)
+                for index in range(blocks)
+            ]
+        except (ValueError, struct.error):
+            self._map.close()
+            raise
+
+        self.compressed = bool(flags & self.FLAG_ZSTD)
+        self.directions = ['A+', 'A-'] if flags & self.FLAG_NETO else ['A+']
+
+    def __len__(self):
+        return self.points
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
         """
-        Get the current year e.g. 2024
+        Unmap archive file
         """
-        return self._get_current_date()['year']
+        self._map.close()
 
-    def _get_current_month(self):
+    @staticmethod
+    def _numpy():
         """
-        Get the current month e.g. 02
+        Import numpy on first use
         """
-        return self._get_current_date()['month']
+        numpy = _import_numpy()
+        if numpy is None:
+            raise ImportError('MeterArchive requires numpy package to be installed')
+        return numpy
 
-    def _get_current_day(self):
+    @staticmethod
+    def _zstd():
         """
-        Get the current day e.g. 14
+        Import zstandard on first use
         """
-        return self._get_current_date()['day']
+        try:
+            import zstandard  # pylint: disable=import-outside-toplevel
+        except ImportError as e:
+            raise ImportError('Compressed archive requires zstandard package to be installed') from e
+        return zstandard
 
-    def _get_data_url(self, period=None, year=None, month=None, day=None, granularity=None):
+    @classmethod
+    def write(cls, path, data, compress=False):
         """
-        Prepare data url depending on request type and parameters
-
-        :param period: report time period
-        :type period: str | should be one of self.PERIOD_<*>
-        :param year: year
-        :type year: str | None
-        :param month: month
-        :type month: str | None
-        :param day: day
-        :type day: str | None
-        :param granularity: report data type
-        :type granularity: str | should be one of self.GRANULARITY_<*>
+        Save meter data series, replacing the file atomically
 
-        :return: generated data url
+        :param path: archive file path
+        :param data: data as returned by STScraper.get_<*>_data methods
+        :type data: list | dict | MeterSeries
+        :param compress: compress blocks with zstd, requires zstandard package
+        :return: file size in bytes
+        :rtype: int
         """
+        series = data if isinstance(data, MeterSeries) else MeterSeries.from_records(data)
+        np = cls._numpy()
+        compressor = cls._zstd().ZstdCompressor(level=cls.ZSTD_LEVEL) if compress else None
 
-        params = {
-            'objectEic': self.object_id,
-            'counterNumber': self.meter_id,
-            'period': period
-        }
+        timestamps = series.timestamps.astype(np.int64)
+        directions = ['A+', 'A-'] if 'A-' in series.values else ['A+']
 
-        year = year or self._get_current_year()
+        columns = []
+        for direction in directions:
+            missing = np.isnan(series.values[direction])
+            scaled = np.round(np.where(missing, 0, series.values[direction]) * cls.SCALE)
+            if np.any(np.abs(scaled) >= 2 ** 31):
+                raise ValueError('Values are too large for meter archive')
+            columns.append(np.where(missing, cls.MISSING, scaled).astype('<i4'))
 
-        if period == self.PERIOD_YEAR:
-            params['year'] = year
+        # Blocks also end at gaps too long for delta type
+        gaps = np.flatnonzero(np.diff(timestamps) > 0xFFFFFFFF) + 1
+        edges = [0] + gaps.tolist() + [len(timestamps)]
+        bounds = [bound for first, last in zip(edges, edges[1:])
+                  for bound in range(first, last, cls.BLOCK_SIZE)] + [len(timestamps)]
 
-        if period == self.PERIOD_MONTH:
-            params['year'] = year
-            params['month'] = month or self._get_current_month()
-            params['granularity'] = granularity
+        index, payloads = [], []
+        offset = cls.HEADER.size + cls.BLOCK.size * (len(bounds) - 1)
 
-        if period == self.PERIOD_DAY:
+        for first, last in zip(bounds, bounds[1:]):
+            deltas = np.diff(timestamps[first:last], prepend=timestamps[first]).astype('<u4')
+            payload = deltas.tobytes() + b''.join(column[first:last].tobytes() for column in columns)
+            if compressor:
+                payload = compressor.compress(payload)
 
-            month = month or self._get_current_month()
-            day = day or self._get_current_day()
+            index.append(cls.BLOCK.pack(timestamps[first], timestamps[last - 1], offset,
+                                        len(payload), last - first))
+            payloads.append(payload)
+            offset += len(payload)
 
-            params['date'] = f'{day}.{month}.{year}'
-            params['granularity'] = granularity
+        flags = (cls.FLAG_ZSTD if compress else 0) | (cls.FLAG_NETO if len(directions) > 1 else 0)
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, flags, len(index), len(timestamps))
 
-        print(self.DATA_URL + '?' + urlencode(params))
-        return self.DATA_URL + '?' + urlencode(params)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header + b''.join(index) + b''.join(payloads))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
 
-    @staticmethod
-    def _format_timestamp(timestamp):
+        return offset
+
+    def read(self, start=None, end=None):
         """
-        Convert JS timestamp to human readable date and time
+        Read the series, optionally limited to the days of given range
 
-        :param timestamp: timestamp
-        :return: datetime e.g. 2024-02-14 02:00:00
-        :rtype: str
+        :param start: first day to read
+        :type start: date | None
+        :param end: last day to read
+        :type end: date | None
+        :rtype: MeterSeries
         """
-        return datetime.fromtimestamp(
-            int(timestamp) / 1000.0, tz=timezone(timedelta(hours=0))
-        ).strftime('%Y-%m-%d %H:%M:%S')
+        np = self._numpy()
 
-    def _format_response(self, response_data, neto=True):
+        first = last = None
+        blocks = self._blocks
+
+        # Blocks are ordered by time, so only the overlapping ones are found by bisection
+        if start:
+            first = int(datetime(start.year, start.month, start.day,
+                                 tzinfo=timezone.utc).timestamp()) * 1000
+            blocks = blocks[bisect.bisect_left([block[1] for block in blocks], first):]
+
+        if end:
+            last = int(datetime(end.year, end.month, end.day,
+                                tzinfo=timezone.utc).timestamp() + 24 * 60 * 60) * 1000
+            blocks = blocks[:bisect.bisect_left([block[0] for block in blocks], last)]
+
+        parts = [self._read_block(*block) for block in blocks]
+
+        timestamps = np.concatenate([part[0] for part in parts] or [np.empty(0, np.int64)])
+        values = {direction: np.concatenate([part[1][direction] for part in parts] or [np.empty(0)])
+                  for direction in self.directions}
+
+        if first is not None or last is not None:
+            mask = np.ones(len(timestamps), bool)
+            if first is not None:
+                mask &= timestamps >= first
+            if last is not None:
+                mask &= timestamps < last
+            timestamps = timestamps[mask]
+            values = {direction: vals[mask] for direction, vals in values.items()}
+
+        return MeterSeries(timestamps, values)
+
+    def _read_block(self, first, _last, offset, size, count):
         """
-        Parse out the real data from graph json
+        Decode block of the archive
 
-        :param response_data: graph json source
-        :return: parsed data
+        :return: timestamps and values by direction
         """
-        response_cons_data = response_data['values']['A+']['total']['data']
+        np = self._numpy()
 
-        if "A-" in response_data['values'].keys():
-            response_neto_data = response_data['values']['A-']['total']['data']
+        if self.compressed:
+            decompressor = self._zstd().ZstdDecompressor()
+            buffer, offset = decompressor.decompress(self._map[offset:offset + size]), 0
         else:
-            neto = False
+            buffer = self._map
 
-        cons_data = [{
-            'data': self._format_timestamp(item['timestamp']),
-            'value': item['value']
-        } for item in response_cons_data]
+        timestamps = first + np.cumsum(np.frombuffer(buffer, '<u4', count, offset), dtype=np.int64)
 
-        if neto:
-            neto_data = [{
-                'data': self._format_timestamp(item['timestamp']),
-                'value': item['value']
-            } for item in response_neto_data]
+        values = {}
+        for index, direction in enumerate(self.directions):
+            raw = np.frombuffer(buffer, '<i4', count, offset + 4 * count * (index + 1))
+            values[direction] = np.where(raw == self.MISSING, np.nan, raw / self.SCALE)
 
-            data = {
-                'A+': cons_data,
-                'A-': neto_data
-            }
-        else:
-            data = cons_data
+        return timestamps, values
 
-        return data
 
-    def get_day_data(self, neto=True, year=None, month=None, day=None):
+class DayPoller:
+    """
+    Polls hourly data of the recent days and returns only newly published readings
+    """
+
+    # Yesterday is polled too, as the last hours of the day are published after midnight
+    DEFAULT_DAYS = 2
+
+    def __init__(self, scraper, neto=True, days=DEFAULT_DAYS, store=None):
         """
-        Get the data of the specified day
+        Class initialisation
 
-        :param year:
-        :param month:
-        :param day:
-        :return:
+        :param scraper: scraper of the polled meter
+        :type scraper: STScraper
+        :param days: number of recent days to poll, including today
+        :param store: optional storage of earlier runs' readings, which are then not returned again
+        :type store: SQLiteStore | None
         """
-        response = self._fetch_remote_data(period=self.PERIOD_DAY, month=month,
-                                           year=year, day=day,
-                                           granularity=self.GRANULARITY_HOUR)
-        return self._format_response(response, neto)
+        self.scraper = scraper
+        self.neto = neto
+        self.days = days
+        self.store = store
+        self._seen = None
 
-    def get_month_data(self, neto=True, year=None, month=None):
+    def poll(self):
         """
-        Get the data of the specified month
+        Get readings published since the previous poll, including changed values
 
-        :param year:
-        :param month:
-        :return:
+        :return: new data in the same format as STScraper.get_day_data, lists of dicts
+                 also for scrapers returning MeterSeries
         """
-        response = self._fetch_remote_data(period=self.PERIOD_MONTH, month=month, year=year,
-                                           granularity=self.GRANULARITY_DAY)
-        return self._format_response(response, neto)
+        today = date.today()
+        first = today - timedelta(days=self.days - 1)
 
-    def get_year_data(self, neto=True, year=None):
+        if self._seen is None:
+            self._seen = {}
+            if self.store:
+                stored = self.store.load(self.scraper.meter_id, STScraper.GRANULARITY_HOUR,
+                                         start=first, end=today, object_id=self.scraper.object_id)
+                for direction, items in stored.items():
+                    for item in items:
+                        self._seen[(direction, item['data'])] = item['value']
+
+        # Readings are marked as seen only when all days are retrieved, so that
+        # a failed poll returns them again next time
+        new, seen = {}, {}
+
+        for offset in range(self.days):
+            day = first + timedelta(days=offset)
+            data = self.scraper.get_day_data(self.neto, f'{day.year}', f'{day.month:02d}',
+                                             f'{day.day:02d}')
+            if isinstance(data, MeterSeries):
+                data = data.to_records()
+            series = data if isinstance(data, dict) else {'A+': data}
+
+            for direction, items in series.items():
+                new.setdefault(direction, [])
+                for item in items:
+                    key = (direction, item['data'])
+                    if item['value'] is not None and self._seen.get(key) != item['value']:
+                        seen[key] = item['value']
+                        new[direction].append(item)
+
+        self._seen.update(seen)
+
+        # Forget readings of the days no longer polled
+        first_date = first.strftime('%Y-%m-%d')
+        self._seen = {key: value for key, value in self._seen.items() if key[1] >= first_date}
+
+        return new if 'A-' in new else new.get('A+', [])
+
+
+class DataServer:
+    """
+    Read-through http api serving meter data from store or cache and fetching it from the portal
+    only on misses, concurrent identical requests share one retrieval:
+
+    GET /meters/<meter>/day?year=&month=&day=
+    GET /meters/<meter>/month?year=&month=
+    GET /meters/<meter>/year?year=
+    GET /meters/<meter>/range?start=&end=&granularity=hour|day
+
+    <meter> is smart meter ID, or objectid:meter when several objects have the same meter ID.
+    """
+
+    GRANULARITIES = {'hour': STScraper.GRANULARITY_HOUR, 'day': STScraper.GRANULARITY_DAY}
+
+    def __init__(self, account, meters, neto=True, store=None):
         """
-        Get the data of the specified year
+        Class initialisation
 
-        :param year:
-        :return:
+        :param account: account client, should have a cache
+        :type account: STAccount
+        :param meters: list of (object EIC ID, smart meter ID) pairs
+        :param store: optional storage serving complete data of past periods, portal
+                      responses are saved to it
+        :type store: SQLiteStore | None
         """
-        response = self._fetch_remote_data(period=self.PERIOD_YEAR, year=year)
-        return self._format_response(response, neto)
+        self.neto = neto
+        self.store = store
+        self.scrapers = {
+            (object_id, meter_id): account.get_scraper(object_id, meter_id)
+            for object_id, meter_id in meters
+        }
+        self._flight = SingleFlight()
 
-    def _fetch_remote_data(self, **kwargs):
+    def _find_scraper(self, meter):
         """
-        Do authentification and retrieve the data
+        Find scraper of the meter
 
-        :param kwargs:
-        :return:
+        :param meter: smart meter ID or objectid:meter
+        :rtype: STScraper
+        :raises KeyError: on unknown meter
+        :raises ValueError: when meter ID belongs to several objects
         """
-        response = self.session.get(self._get_data_url(**kwargs))
-        root = PyQuery(response.text)
+        if ':' in meter:
+            return self.scrapers[tuple(meter.split(':', 1))]
 
-        fields = (
-            '_token',
-            'returnUrl',
-            'login',
-            'password'
-        )
+        scrapers = [scraper for (_, meter_id), scraper in self.scrapers.items() if meter_id == meter]
+        if not scrapers:
+            raise KeyError(meter)
+        if len(scrapers) > 1:
+            raise ValueError(f'Meter {meter} belongs to several objects, use objectid:meter')
 
-        values = {}
-        for field in fields:
-            values[field] = root(f'input[name={field}]').attr('value')
+        return scrapers[0]
+
+    def _get_stored(self, scraper, start, end, granularity, points):
+        """
+        Load data of a past period from the store when it holds all its points
+
+        :param scraper: scraper of the meter
+        :type scraper: STScraper
+        :param points: number of points of the complete period
+        :return: stored data or None
+        """
+        if not self.store or date.today() - end < STScraper.FINAL_DELAY:
+            return None
+
+        data = self.store.load(scraper.meter_id, granularity, self.neto, start, end, scraper.object_id)
+        if len(data['A+'] if isinstance(data, dict) else data) < points:
+            return None
+
+        return data
+
+    def get_data(self, meter, period, query):
+        """
+        Get the data of the meter
+
+        :param meter: smart meter ID or objectid:meter
+        :param period: day, month, year or range
+        :param query: query parameters
+        :type query: dict
+        :raises KeyError: on unknown meter or period
+        :raises ValueError: on invalid parameters
+        """
+        scraper = self._find_scraper(meter)
+        year, month, day = query.get('year'), query.get('month'), query.get('day')
+        # Days, granularity and number of points of the period, when it is fully specified
+        bounds = None
+
+        if period == 'day':
+            if year and month and day:
+                first = date(int(year), int(month), int(day))
+                bounds = (first, first, STScraper.GRANULARITY_HOUR, 24)
+
+            def call():
+                return scraper.get_day_data(self.neto, year, month, day)
+        elif period == 'month':
+            if year and month:
+                first = date(int(year), int(month), 1)
+                last = (first + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+                bounds = (first, last, STScraper.GRANULARITY_DAY, last.day)
+
+            def call():
+                return scraper.get_month_data(self.neto, year, month)
+        elif period == 'year':
+            if year:
+                bounds = (date(int(year), 1, 1), date(int(year), 12, 31),
+                          SQLiteStore.GRANULARITY_MONTH, 12)
+
+            def call():
+                return scraper.get_year_data(self.neto, year)
+        elif period == 'range':
+            if 'start' not in query or 'end' not in query:
+                raise ValueError('Range start and end must be set')
+
+            start = date.fromisoformat(query['start'])
+            end = date.fromisoformat(query['end'])
+            granularity = self.GRANULARITIES[query.get('granularity', 'hour')]
+            days = (end - start).days + 1
+            bounds = (start, end, granularity,
+                      days * 24 if granularity == STScraper.GRANULARITY_HOUR else days)
+
+            def call():
+                return scraper.get_range_data(start, end, granularity, self.neto)
+        else:
+            raise KeyError(period)
+
+        def read_through():
+            if bounds:
+                data = self._get_stored(scraper, *bounds)
+                if data is not None:
+                    return data
+
+            data = call()
+            if isinstance(data, MeterSeries):
+                data = data.to_records()
+
+            if self.store and bounds:
+                self.store.save(scraper.meter_id, data, bounds[2], scraper.object_id)
+
+            return data
+
+        key = (scraper.object_id, scraper.meter_id, period, tuple(sorted(query.items())))
+        return self._flight.do(key, read_through)
+
+    def serve(self, port, host='127.0.0.1'):
+        """
+        Create the http server, call its serve_forever() method to run it
+
+        :param port: port to listen on
+        :param host: address to listen on
+        :rtype: ThreadingHTTPServer
+        """
+        # pylint: disable-next=import-outside-toplevel
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                url = urlsplit(self.path)
+                parts = url.path.strip('/').split('/')
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+                if len(parts) != 3 or parts[0] != 'meters':
+                    self._send(404, {'error': 'Not found'})
+                    return
+
+                try:
+                    data = api.get_data(parts[1], parts[2], query)
+                except KeyError:
+                    self._send(404, {'error': 'Unknown meter, period or granularity'})
+                except _portal_errors() as e:
+                    self._send(502, {'error': str(e)})
+                except ValueError as e:
+                    self._send(400, {'error': str(e)})
+                else:
+                    self._send(200, data)
+
+            def _send(self, status, data):
+                body = json.dumps(data).encode('utf8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+        return ThreadingHTTPServer((host, port), Handler)
+
+
+def _parse_timestamp(value):
+    """
+    Convert human readable date and time back to JS timestamp
+
+    :param value: datetime e.g. 2024-02-14 02:00:00
+    :return: timestamp in milliseconds
+    :rtype: int
+    """
+    parsed = datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp()) * 1000
 
-        values['login'] = self.login
-        values['password'] = self.password
 
-        response = self.session.post(self.LOGIN_URL, data=values)
-        root = PyQuery(response.text)
-        values = root('div.chart').attr('data-values')
-        return json.loads(values)
+def _iter_readings(data, meter_id):
+    """
+    Flatten data into (meter, direction, timestamp, value) tuples
+
+    :param data: data as returned by STScraper.get_<*>_data methods
+    :type data: list | dict | MeterSeries
+    :param meter_id: smart meter ID the data belong to
+    """
+    if isinstance(data, MeterSeries):
+        data = data.to_records()
+
+    series = data if isinstance(data, dict) else {'A+': data}
+    for direction, items in series.items():
+        for item in items:
+            yield meter_id, direction, item['data'], item['value']
+
+
+def rollup(data, unit):
+    """
+    Aggregate hourly or daily data into totals of calendar days, months or years,
+    e.g. to get month data from already retrieved day data without portal requests.
+    Requires numpy package.
+
+    :param data: data as returned by STScraper.get_<*>_data methods or SQLiteStore.load
+    :type data: list | dict | MeterSeries
+    :param unit: day, month or year
+    :return: totals in the same format as data
+    """
+    if isinstance(data, MeterSeries):
+        return data.rollup(unit)
+
+    return MeterSeries.from_records(data).rollup(unit).to_records()
+
+
+def write_table(data, path, file_format):
+    """
+    Save data in columnar format with epoch milliseconds timestamps, requires pyarrow package
+
+    :param data: data by smart meter ID
+    :type data: dict
+    :param path: output file path
+    :param file_format: parquet or arrow
+    """
+    try:
+        import pyarrow  # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet  # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise ImportError(f'{file_format} format requires pyarrow package to be installed') from e
+
+    columns = {'meter': [], 'direction': [], 'timestamp': [], 'value': []}
+    for meter_id, meter_data in data.items():
+        for meter, direction, timestamp, value in _iter_readings(meter_data, meter_id):
+            columns['meter'].append(meter)
+            columns['direction'].append(direction)
+            columns['timestamp'].append(_parse_timestamp(timestamp))
+            columns['value'].append(value)
+
+    table = pyarrow.table({
+        'meter': pyarrow.array(columns['meter'], pyarrow.string()).dictionary_encode(),
+        'direction': pyarrow.array(columns['direction'], pyarrow.string()).dictionary_encode(),
+        'timestamp': pyarrow.array(columns['timestamp'], pyarrow.int64()),
+        'value': pyarrow.array(columns['value'], pyarrow.float64())
+    })
+
+    if file_format == 'parquet':
+        pyarrow.parquet.write_table(table, path)
+    else:
+        with pyarrow.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table)
+
+
+def write_ndjson(data, meter_id, f):
+    """
+    Write data as one compact json object per reading and flush it
+
+    :param data: data as returned by STScraper.get_<*>_data methods
+    :type data: list | dict | MeterSeries
+    :param meter_id: smart meter ID the data belong to
+    :param f: output file
+    """
+    for meter, direction, timestamp, value in _iter_readings(data, meter_id):
+        f.write(json.dumps({
+            'meter': meter,
+            'direction': direction,
+            'timestamp': timestamp,
+            'value': value
+        }, separators=(',', ':')) + '\n')
+    f.flush()
 
 
 def main():
@@ -236,40 +3447,291 @@ def main():
     parser.add_argument('--password', default=None, help='Website password')
     parser.add_argument('--objectid', default=None, help='Object ID')
     parser.add_argument('--meter', default=None, help='Electricity meter ID')
+    parser.add_argument('--meters', default=None, nargs='+', metavar='OBJECTID:METER',
+                        help='Several object and electricity meter ID pairs of the account')
     parser.add_argument('--period', default='month', help='Report data time period')
     parser.add_argument('--year', default=None)
     parser.add_argument('--month', default=None)
     parser.add_argument('--day', default=None)
+    parser.add_argument('--start', default=None, help='Range period first day e.g. 2024-02-01')
+    parser.add_argument('--end', default=None, help='Range period last day e.g. 2024-02-29')
+    parser.add_argument('--granularity', default='hour', help='Range period data granularity')
+    parser.add_argument('--workers', default=STScraper.DEFAULT_WORKERS, type=int,
+                        help='Number of parallel requests for range period or meters')
     parser.add_argument('--neto', default=True, help="Include generation data")
     parser.add_argument('--outfile', default=None, help='Save data in specified file')
+    parser.add_argument('--format', default='json',
+                        choices=('json', 'ndjson', 'parquet', 'arrow', 'archive'),
+                        help='Output data format, parquet, arrow and archive require outfile')
+    parser.add_argument('--compress', action='store_true',
+                        help='Compress archive format with zstd')
+    parser.add_argument('--cookie-dir', default=None,
+                        help='Keep logged in session in specified directory between runs')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Cache portal responses in specified directory')
+    parser.add_argument('--cache-ttl', default=ResponseCache.DEFAULT_TTL, type=int,
+                        help='Seconds to cache data of current period')
+    parser.add_argument('--cache-size', default=ResponseCache.DEFAULT_MAX_SIZE // 1024 // 1024,
+                        type=int, help='Maximum cache size in MB')
+    parser.add_argument('--rate-limit', default=None, type=float,
+                        help='Initial portal requests per second, adjusted to portal responsiveness')
+    parser.add_argument('--timeout', default=ResiliencePolicy.DEFAULT_READ_TIMEOUT, type=float,
+                        help='Seconds to wait for portal response')
+    parser.add_argument('--retries', default=ResiliencePolicy.DEFAULT_RETRIES, type=int,
+                        help='Number of retries of failed portal requests')
+    parser.add_argument('--stats', action='store_true',
+                        help='Print timing summary of scraper work phases')
+    parser.add_argument('--metrics-port', default=None, type=int,
+                        help='Serve Prometheus metrics on specified port while running')
+    parser.add_argument('--metrics-file', default=None,
+                        help='Write Prometheus metrics to specified file at the end of the run')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep polling hourly data of today and yesterday, output only new readings')
+    parser.add_argument('--interval', default=15 * 60, type=int,
+                        help='Seconds between daemon polls')
+    parser.add_argument('--server-port', default=None, type=int,
+                        help='Serve meter data over http api on specified port')
+    parser.add_argument('--server-host', default='127.0.0.1', help='Http api address')
+    parser.add_argument('--db', default=None,
+                        help='Store data in specified SQLite database, required for sync period')
+    parser.add_argument('--rollup', default=None, choices=tuple(MeterSeries.ROLLUP_UNITS),
+                        help='Aggregate hourly data stored in database into totals of specified '
+                             'period without portal requests')
+    parser.add_argument('--plan', action='store_true',
+                        help='Retrieve range period with the fewest portal requests, probing which '
+                             'period and granularity combinations the portal supports')
+    parser.add_argument('--plan-file', default=None,
+                        help='Keep probed portal capabilities and request time in specified file '
+                             'between runs, implies --plan')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Print range period requests and estimated time without retrieving data')
     opts = parser.parse_args()
 
-    if not opts.username or not opts.password:
+    if opts.dry_run:
+        if opts.period != 'range':
+            raise TypeError('Dry run is supported for range period only')
+    elif opts.rollup:
+        if not opts.db:
+            raise TypeError('Database must be set for rollup')
+
+        if opts.daemon or opts.server_port:
+            raise ValueError('Rollup can not be used with daemon mode or http api')
+    elif not opts.username or not opts.password:
         raise TypeError('Username and/or password must be set')
 
-    if not opts.objectid:
-        raise TypeError('Object ID must be set')
+    if opts.meters:
+        meters = [tuple(meter.split(':', 1)) for meter in opts.meters]
+        if any(len(meter) != 2 for meter in meters):
+            raise ValueError('Meters must be specified as objectid:meter')
+        meter_keys = dict(zip(meters, STAccount.meter_keys(meters)))
+    else:
+        meter_keys = {}
+
+        if not opts.objectid and not opts.rollup and not opts.dry_run:
+            raise TypeError('Object ID must be set')
 
-    if not opts.meter:
-        raise TypeError('Electricity meter ID must be set')
+        if not opts.meter and not opts.dry_run:
+            raise TypeError('Electricity meter ID must be set')
 
-    scraper = STScraper(opts.username, opts.password, opts.objectid, opts.meter)
+    granularities = {'hour': STScraper.GRANULARITY_HOUR, 'day': STScraper.GRANULARITY_DAY}
 
-    # Adjusted call to data retrieval methods based on selected period
-    if opts.period == 'year':
-        data = scraper.get_year_data(opts.neto, opts.year)
-    elif opts.period == 'month':
-        data = scraper.get_month_data(opts.neto, opts.year, opts.month)
-    elif opts.period == 'day':
-        data = scraper.get_day_data(opts.neto, opts.year, opts.month, opts.day)
-    else:
+    if opts.period == 'range':
+        if not opts.start or not opts.end:
+            raise TypeError('Range start and end must be set')
+    elif opts.period == 'sync':
+        if not opts.db:
+            raise TypeError('Database must be set for sync period')
+    elif opts.period not in ('year', 'month', 'day'):
         raise ValueError("Invalid period specified")
 
-    if opts.outfile:
-        with open(opts.outfile, 'w', encoding="utf8") as f:
-            json.dump(data, f, indent=4)
-    else:
-        print(json.dumps(data, indent=4))
+    if opts.period in ('range', 'sync') and opts.granularity not in granularities:
+        raise ValueError("Invalid granularity specified")
+
+    if opts.server_port and opts.daemon:
+        raise ValueError('Daemon mode and http api can not be used together')
+
+    if opts.daemon:
+        if opts.format in ('parquet', 'arrow', 'archive'):
+            raise ValueError(f'{opts.format} format is not supported in daemon mode')
+
+        # Daemon readings are streamed, so JSON output becomes NDJSON
+        opts.format = 'ndjson'
+    elif opts.format in ('parquet', 'arrow', 'archive') and not opts.outfile:
+        raise TypeError(f'Outfile must be set for {opts.format} format')
+
+    planner = RequestPlanner(opts.plan_file) if opts.plan or opts.plan_file or opts.dry_run else None
+
+    if opts.dry_run:
+        # Only combinations probed by earlier runs are used, as nothing is requested
+        plan = planner.plan(date.fromisoformat(opts.start), date.fromisoformat(opts.end),
+                            granularities[opts.granularity])
+        # Placeholders are printed for IDs not given, as nothing is requested
+        scrapers = [STScraper(opts.username, opts.password, object_id, meter_id)
+                    for object_id, meter_id in (meters if opts.meters else
+                                                [(opts.objectid or 'objectid', opts.meter or 'meter')])]
+        requests_count = len(plan) * len(scrapers)
+
+        for scraper in scrapers:
+            for kwargs in plan:
+                print(scraper.DATA_URL + '?' + urlencode(scraper._get_data_params(**kwargs)))
+
+        unknown = [period for period in RequestPlanner.LAYOUTS[granularities[opts.granularity]]
+                   if planner.is_supported(period, granularities[opts.granularity]) is None]
+        print(f'{requests_count} requests, estimated time '
+              f'{planner.estimate(requests_count, opts.workers, opts.rate_limit):.1f} s'
+              + (f', periods not probed yet: {", ".join(unknown)}' if unknown else ''))
+        return
+
+    store = SQLiteStore(opts.db) if opts.db else None
+
+    # NDJSON readings are written as soon as each period is retrieved
+    ndjson_file = None
+    ndjson_lock = threading.Lock()
+
+    def output(scraper, data, granularity=None):
+        if store and granularity:
+            store.save(scraper.meter_id, data, granularity, scraper.object_id)
+
+        if ndjson_file:
+            with ndjson_lock:
+                write_ndjson(data, meter_keys.get((scraper.object_id, scraper.meter_id),
+                                                  scraper.meter_id), ndjson_file)
+
+    def fetch(scraper):
+        # Adjusted call to data retrieval methods based on selected period
+        if opts.rollup:
+            data = store.rollup(scraper.meter_id, opts.rollup, opts.neto,
+                                date.fromisoformat(opts.start) if opts.start else None,
+                                date.fromisoformat(opts.end) if opts.end else None,
+                                object_id=scraper.object_id)
+            output(scraper, data)
+        elif opts.period == 'year':
+            data = scraper.get_year_data(opts.neto, opts.year)
+            output(scraper, data, SQLiteStore.GRANULARITY_MONTH)
+        elif opts.period == 'month':
+            data = scraper.get_month_data(opts.neto, opts.year, opts.month)
+            output(scraper, data, STScraper.GRANULARITY_DAY)
+        elif opts.period == 'day':
+            data = scraper.get_day_data(opts.neto, opts.year, opts.month, opts.day)
+            output(scraper, data, STScraper.GRANULARITY_HOUR)
+        elif opts.period == 'sync':
+            start = date.fromisoformat(opts.start) if opts.start else None
+            data = store.sync(scraper, granularities[opts.granularity], start, opts.neto,
+                              opts.workers)
+            output(scraper, data)
+        elif ndjson_file:
+            data = None
+            for piece in scraper.iter_range_data(date.fromisoformat(opts.start),
+                                                 date.fromisoformat(opts.end),
+                                                 granularities[opts.granularity], opts.neto,
+                                                 opts.workers):
+                output(scraper, piece, granularities[opts.granularity])
+        else:
+            data = scraper.get_range_data(date.fromisoformat(opts.start),
+                                          date.fromisoformat(opts.end),
+                                          granularities[opts.granularity], opts.neto, opts.workers)
+            output(scraper, data, granularities[opts.granularity])
+
+        return data
+
+    cookie_store = CookieStore(opts.cookie_dir, opts.username) if opts.cookie_dir else None
+    cache = ResponseCache(opts.cache_dir, opts.cache_ttl,
+                          opts.cache_size * 1024 * 1024) if opts.cache_dir else None
+
+    if opts.server_port and not cache:
+        cache = MemoryCache(opts.cache_ttl)
+
+    rate_limiter = RateLimiter(opts.rate_limit, max(opts.rate_limit, RateLimiter.DEFAULT_MAX_RATE),
+                               opts.workers) if opts.rate_limit else None
+
+    resilience = ResiliencePolicy(read_timeout=opts.timeout, retries=opts.retries)
+    stats = PhaseStats() if opts.stats else None
+    metrics = ScraperMetrics(rate_limiter) if opts.metrics_port or opts.metrics_file else None
+
+    if opts.metrics_port:
+        metrics.serve(opts.metrics_port)
+
+    if opts.server_port:
+        account = STAccount(opts.username, opts.password, cookie_store, cache,
+                            rate_limiter=rate_limiter, resilience=resilience, stats=stats,
+                            metrics=metrics, planner=planner)
+        server = DataServer(account, meters if opts.meters else [(opts.objectid, opts.meter)],
+                            opts.neto, store).serve(opts.server_port, opts.server_host)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if opts.format == 'ndjson':
+        ndjson_file = open(opts.outfile, 'a' if opts.daemon else 'w',
+                           encoding='utf8') if opts.outfile else sys.stdout
+
+    try:
+        if opts.meters:
+            account = STAccount(opts.username, opts.password, cookie_store, cache,
+                                rate_limiter=rate_limiter, resilience=resilience, stats=stats,
+                                metrics=metrics, planner=planner)
+            scrapers = [account.get_scraper(object_id, meter_id) for object_id, meter_id in meters]
+        else:
+            account = None
+            scrapers = [STScraper(opts.username, opts.password, opts.objectid, opts.meter,
+                                  cookie_store, cache=cache, rate_limiter=rate_limiter,
+                                  resilience=resilience, stats=stats, metrics=metrics,
+                                  planner=planner)]
+
+        if opts.daemon:
+            pollers = [DayPoller(scraper, opts.neto, store=store) for scraper in scrapers]
+
+            while True:
+                for poller in pollers:
+                    try:
+                        output(poller.scraper, poller.poll(), STScraper.GRANULARITY_HOUR)
+                    except _portal_errors() + (ValueError,) as e:
+                        print(f'Polling meter {poller.scraper.meter_id} failed: {e}',
+                              file=sys.stderr)
+
+                if opts.metrics_file:
+                    metrics.write_textfile(opts.metrics_file)
+
+                time.sleep(opts.interval)
+        elif account:
+            data = account.get_meters_data(meters, fetch, opts.workers)
+        else:
+            data = fetch(scrapers[0])
+    except KeyboardInterrupt:
+        if not opts.daemon:
+            raise
+        return
+    finally:
+        if ndjson_file and ndjson_file is not sys.stdout:
+            ndjson_file.close()
+
+    if opts.format in ('parquet', 'arrow'):
+        write_table(data if opts.meters else {opts.meter: data}, opts.outfile, opts.format)
+    elif opts.format == 'archive':
+        if opts.meters:
+            # Archive holds series of a single meter, so each meter gets its own file
+            root, ext = os.path.splitext(opts.outfile)
+            for key, meter_data in data.items():
+                MeterArchive.write(f'{root}-{key.replace(":", "-")}{ext}', meter_data, opts.compress)
+        else:
+            MeterArchive.write(opts.outfile, data, opts.compress)
+    elif opts.format == 'json':
+        if opts.outfile:
+            with open(opts.outfile, 'w', encoding="utf8") as f:
+                json.dump(data, f, indent=4)
+        else:
+            print(json.dumps(data, indent=4))
+
+    if stats:
+        print(stats.format_table(), file=sys.stderr)
+
+    if opts.metrics_file:
+        metrics.write_textfile(opts.metrics_file)
+
+    if planner:
+        planner.save()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,43 @@
+"""
+Shared test fixtures
+"""
+
+import os
+import sys
+import socket
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark  # noqa: E402  pylint: disable=wrong-import-position
+
+
+@pytest.fixture(scope='session')
+def portal_port():
+    """
+    Run mock portal in a background thread and get its port
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    ready = threading.Event()
+    threading.Thread(target=benchmark.serve, args=(port,), kwargs={'ready': ready}, daemon=True).start()
+    ready.wait(10)
+
+    return port
+
+
+@pytest.fixture
+def portal_stats(portal_port):  # pylint: disable=unused-argument
+    """
+    Get mock portal request counters since the start of the test
+    """
+    before = dict(benchmark.MockPortalHandler.stats)
+
+    def get_stats():
+        return {key: value - before[key] for key, value in benchmark.MockPortalHandler.stats.items()}
+
+    return get_stats
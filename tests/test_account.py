@@ -0,0 +1,81 @@
+"""
+STAccount tests against the mock portal
+"""
+
+import json
+import sys
+from urllib.parse import urlsplit
+
+import pytest
+
+import benchmark
+import main
+from main import STAccount, STScraper
+
+pytest.importorskip('requests')
+pytest.importorskip('pyquery')
+
+OBJECTS = ['40X000000000001X', '40X000000000002X']
+METERS = [(OBJECTS[0], benchmark.METER_ID), (OBJECTS[1], benchmark.METER_ID), (OBJECTS[0], '87654321')]
+
+
+@pytest.fixture(autouse=True)
+def local_portal(portal_port, monkeypatch):
+    """
+    Make scrapers use the mock portal
+    """
+    host = f'http://127.0.0.1:{portal_port}'
+    monkeypatch.setattr(STScraper, 'BASE_HOST', host)
+    monkeypatch.setattr(STScraper, 'LOGIN_URL', host + urlsplit(STScraper.LOGIN_URL).path)
+    monkeypatch.setattr(STScraper, 'DATA_URL', host + urlsplit(STScraper.DATA_URL).path)
+
+
+def run_main(monkeypatch, *args):
+    """
+    Run main with given command line arguments of --meters retrieval
+    """
+    monkeypatch.setattr(sys, 'argv', [
+        'main.py', '--username', benchmark.LOGIN, '--password', benchmark.PASSWORD,
+        '--meters', *(f'{object_id}:{meter_id}' for object_id, meter_id in METERS),
+        '--period', 'day', '--year', '2024', '--month', '02', '--day', '14', *args
+    ])
+    main.main()
+
+
+def test_meter_keys():
+    assert STAccount.meter_keys(METERS) == [f'{OBJECTS[0]}:{benchmark.METER_ID}',
+                                            f'{OBJECTS[1]}:{benchmark.METER_ID}', '87654321']
+    assert STAccount.meter_keys(METERS[1:]) == [benchmark.METER_ID, '87654321']
+
+
+def test_meters_with_same_id(portal_stats):
+    account = STAccount(benchmark.LOGIN, benchmark.PASSWORD)
+
+    data = account.get_meters_data(METERS, lambda scraper: scraper.get_day_data(year=2024, month=2, day=14))
+    assert list(data) == STAccount.meter_keys(METERS)
+    assert all(len(meter_data['A+']) == 24 for meter_data in data.values())
+    assert portal_stats()['logins'] == 1
+
+
+def test_json_output(monkeypatch, tmp_path):
+    run_main(monkeypatch, '--outfile', str(tmp_path / 'data.json'))
+
+    with open(tmp_path / 'data.json', encoding='utf8') as f:
+        assert list(json.load(f)) == STAccount.meter_keys(METERS)
+
+
+def test_ndjson_output(monkeypatch, capsys):
+    run_main(monkeypatch, '--format', 'ndjson')
+
+    readings = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert {reading['meter'] for reading in readings} == set(STAccount.meter_keys(METERS))
+
+
+def test_archive_files(monkeypatch, tmp_path):
+    pytest.importorskip('numpy')
+    run_main(monkeypatch, '--format', 'archive', '--outfile', str(tmp_path / 'history.stma'))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        f'history-{OBJECTS[0]}-{benchmark.METER_ID}.stma', f'history-{OBJECTS[1]}-{benchmark.METER_ID}.stma',
+        'history-87654321.stma'
+    ]
@@ -0,0 +1,164 @@
+"""
+MeterArchive write and read tests
+"""
+
+from datetime import date, datetime, timezone
+
+import pytest
+
+from main import MeterArchive, MeterSeries
+
+np = pytest.importorskip('numpy')
+
+HOUR = 60 * 60 * 1000
+DAY = 24 * HOUR
+
+
+def js_timestamp(day):
+    """
+    Get JS timestamp of the day start
+    """
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()) * 1000
+
+
+def make_series(neto=True):
+    """
+    Make two and a half years of hourly data with missing values and a 60 day gap
+    """
+    first = np.arange(js_timestamp(date(2021, 1, 1)), js_timestamp(date(2022, 6, 1)), HOUR)
+    second = np.arange(js_timestamp(date(2022, 7, 31)), js_timestamp(date(2023, 7, 1)), HOUR)
+    timestamps = np.concatenate([first, second]).astype(np.int64)
+
+    rng = np.random.default_rng(1)
+    values = {}
+    for direction in ['A+', 'A-'] if neto else ['A+']:
+        vals = np.round(rng.uniform(0, 5, len(timestamps)), 3)
+        vals[rng.choice(len(timestamps), 100, replace=False)] = np.nan
+        values[direction] = vals
+
+    return MeterSeries(timestamps, values)
+
+
+def assert_series_equal(actual, expected):
+    """
+    Compare series timestamps and values, NaN values being equal
+    """
+    np.testing.assert_array_equal(actual.timestamps, expected.timestamps)
+    assert list(actual.values) == list(expected.values)
+    for direction, vals in expected.values.items():
+        np.testing.assert_array_equal(actual.values[direction], vals)
+
+
+@pytest.fixture(params=[False, True], ids=['plain', 'zstd'])
+def compress(request):
+    """
+    Write archives uncompressed and compressed
+    """
+    if request.param:
+        pytest.importorskip('zstandard')
+    return request.param
+
+
+def test_roundtrip(tmp_path, compress):
+    series = make_series()
+    path = str(tmp_path / 'history.stma')
+
+    size = MeterArchive.write(path, series, compress)
+
+    with MeterArchive(path) as archive:
+        assert size == (tmp_path / 'history.stma').stat().st_size
+        assert archive.compressed == compress
+        assert archive.directions == ['A+', 'A-']
+        assert len(archive) == len(series)
+        assert_series_equal(archive.read(), series)
+
+
+def test_roundtrip_without_neto(tmp_path, compress):
+    series = make_series(neto=False)
+    path = str(tmp_path / 'history.stma')
+
+    MeterArchive.write(path, series, compress)
+
+    with MeterArchive(path) as archive:
+        assert archive.directions == ['A+']
+        assert_series_equal(archive.read(), series)
+
+
+def test_roundtrip_records(tmp_path, compress):
+    data = {
+        'A+': [{'data': '2024-02-14 00:00:00', 'value': 1.25}, {'data': '2024-02-14 01:00:00', 'value': None}],
+        'A-': [{'data': '2024-02-14 00:00:00', 'value': 0.0}, {'data': '2024-02-14 01:00:00', 'value': 0.5}]
+    }
+    path = str(tmp_path / 'history.stma')
+
+    MeterArchive.write(path, data, compress)
+
+    with MeterArchive(path) as archive:
+        assert archive.read().to_records() == data
+
+
+def test_long_gap_splits_blocks(tmp_path, compress):
+    series = make_series()
+    path = str(tmp_path / 'history.stma')
+
+    MeterArchive.write(path, series, compress)
+
+    gap_end = js_timestamp(date(2022, 7, 31))
+    with MeterArchive(path) as archive:
+        # pylint: disable=protected-access
+        assert any(block[0] == gap_end for block in archive._blocks)
+        assert all(block[1] - block[0] <= (block[4] - 1) * HOUR for block in archive._blocks)
+
+
+@pytest.mark.parametrize('start, end', [
+    (date(2021, 1, 1), date(2021, 1, 1)),
+    (date(2021, 12, 30), date(2022, 1, 2)),
+    (date(2022, 5, 20), date(2022, 8, 10)),
+    (date(2022, 6, 5), date(2022, 7, 20)),
+    (None, date(2021, 3, 1)),
+    (date(2023, 6, 1), None),
+    (date(2024, 1, 1), date(2024, 12, 31)),
+])
+def test_range_read(tmp_path, compress, start, end):
+    series = make_series()
+    path = str(tmp_path / 'history.stma')
+
+    MeterArchive.write(path, series, compress)
+
+    mask = np.ones(len(series), bool)
+    if start:
+        mask &= series.timestamps >= js_timestamp(start)
+    if end:
+        mask &= series.timestamps < js_timestamp(end) + DAY
+    expected = MeterSeries(series.timestamps[mask],
+                           {direction: vals[mask] for direction, vals in series.values.items()})
+
+    with MeterArchive(path) as archive:
+        assert_series_equal(archive.read(start, end), expected)
+
+
+def test_range_read_decodes_overlapping_blocks_only(tmp_path, compress, monkeypatch):
+    path = str(tmp_path / 'history.stma')
+    MeterArchive.write(path, make_series(), compress)
+
+    decoded = []
+    read_block = MeterArchive._read_block  # pylint: disable=protected-access
+
+    def counting_read_block(self, *block):
+        decoded.append(block)
+        return read_block(self, *block)
+
+    monkeypatch.setattr(MeterArchive, '_read_block', counting_read_block)
+
+    with MeterArchive(path) as archive:
+        archive.read(date(2021, 2, 1), date(2021, 2, 28))
+
+    assert len(decoded) == 1
+
+
+def test_not_an_archive(tmp_path):
+    path = tmp_path / 'data.json'
+    path.write_bytes(b'{"A+": []}' + b' ' * 64)
+
+    with pytest.raises(ValueError):
+        MeterArchive(str(path))
@@ -0,0 +1,59 @@
+"""
+AsyncSTScraper tests against the mock portal
+"""
+
+import asyncio
+from urllib.parse import urlsplit
+
+import pytest
+
+import benchmark
+from main import AsyncSTScraper, ResiliencePolicy, STScraper
+
+httpx = pytest.importorskip('httpx')
+pytest.importorskip('pyquery')
+
+
+def local_scraper(port, data_path=urlsplit(STScraper.DATA_URL).path, **kwargs):
+    """
+    Create async scraper using the mock portal
+    """
+    host = f'http://127.0.0.1:{port}'
+    scraper_class = type('LocalAsyncSTScraper', (AsyncSTScraper,), {
+        'BASE_HOST': host,
+        'LOGIN_URL': host + urlsplit(STScraper.LOGIN_URL).path,
+        'DATA_URL': host + data_path
+    })
+    return scraper_class(benchmark.LOGIN, benchmark.PASSWORD, benchmark.OBJECT_ID, benchmark.METER_ID,
+                         **kwargs)
+
+
+async def get_days(scraper, days):
+    """
+    Get data of several days concurrently and close the scraper
+    """
+    async with scraper:
+        return await asyncio.gather(*(scraper.get_day_data(year=2024, month=2, day=day) for day in days))
+
+
+def test_concurrent_days(portal_port, portal_stats):
+    results = asyncio.run(get_days(local_scraper(portal_port), range(1, 9)))
+
+    assert [data['A+'][0]['data'] for data in results] == \
+        [f'2024-02-{day:02} 00:00:00' for day in range(1, 9)]
+    assert portal_stats()['logins'] == 1
+
+
+def test_error_status(portal_port):
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(get_days(local_scraper(portal_port, '/missing'), [14]))
+
+
+@pytest.mark.parametrize('shared_client', [False, True])
+def test_policy_timeout(portal_port, monkeypatch, shared_client):
+    monkeypatch.setattr(benchmark.MockPortalHandler, 'latency', 0.5)
+    client = httpx.AsyncClient(follow_redirects=True) if shared_client else None
+    scraper = local_scraper(portal_port, client=client, resilience=ResiliencePolicy(read_timeout=0.1))
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(get_days(scraper, [14]))
@@ -0,0 +1,74 @@
+"""
+ResponseCache and MemoryCache tests
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from main import MemoryCache, ResponseCache
+
+DATA = {'A+': [[1707868800000], [0.125]]}
+
+
+def test_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=0.2)
+    cache.set('current', DATA)
+    cache.set('final', DATA, True)
+
+    assert cache.get('current') == DATA
+    assert cache.get('missing') is None
+
+    time.sleep(0.3)
+    assert cache.get('current') is None
+    assert cache.get('final') == DATA
+
+
+def test_entries_persist(tmp_path):
+    ResponseCache(str(tmp_path)).set('key', DATA, True)
+
+    cache = ResponseCache(str(tmp_path))
+    assert cache.get('key') == DATA
+    assert cache._size == os.path.getsize(cache._path('key'))  # pylint: disable=protected-access
+
+
+def test_evicts_least_recently_used(tmp_path):
+    size = len(json.dumps({'expires': None, 'data': DATA}))
+    cache = ResponseCache(str(tmp_path), max_size=3 * size)
+
+    for number, key in enumerate(['a', 'b', 'c']):
+        cache.set(key, DATA, True)
+        # Distinct last use times regardless of file system timestamp resolution
+        os.utime(cache._path(key), (1000 + number, 1000 + number))  # pylint: disable=protected-access
+
+    assert cache.get('a') == DATA
+    cache.set('d', DATA, True)
+
+    assert [key for key in 'abcd' if cache.get(key) is not None] == ['a', 'c', 'd']
+    assert cache._size == 3 * size  # pylint: disable=protected-access
+
+
+def test_concurrent_sets_keep_size(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_size=10 ** 9)
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda number: cache.set(str(number % 20), DATA, True), range(400)))
+
+    assert cache._size == sum(entry.stat().st_size for entry in os.scandir(tmp_path))  # pylint: disable=protected-access
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_memory_cache():
+    cache = MemoryCache(ttl=0.2, max_entries=2)
+    cache.set('current', DATA)
+    cache.set('final', DATA, True)
+
+    time.sleep(0.3)
+    assert cache.get('current') is None
+    assert cache.get('final') == DATA
+
+    cache.set('a', DATA, True)
+    cache.set('b', DATA, True)
+    assert cache.get('final') is None
+    assert cache.get('a') == cache.get('b') == DATA
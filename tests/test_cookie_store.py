@@ -0,0 +1,102 @@
+"""
+CookieStore tests
+"""
+
+import json
+import time
+
+import pytest
+
+import benchmark
+from main import CookieStore
+
+requests = pytest.importorskip('requests')
+
+
+def saved_time(store):
+    """
+    Get saved time of the stored session
+    """
+    with open(store.path, encoding='utf8') as f:
+        return json.load(f)['saved']
+
+
+def test_save_and_load(tmp_path):
+    session = requests.Session()
+    session.cookies.set('session', 'abc', domain='127.0.0.1', path='/')
+    session.cookies.set('old', 'x', domain='127.0.0.1', path='/', expires=int(time.time()) - 10)
+    CookieStore(str(tmp_path), 'user').save(session)
+
+    loaded = requests.Session()
+    assert CookieStore(str(tmp_path), 'user').load(loaded)
+    # Expired cookies are not loaded
+    assert {cookie.name: cookie.value for cookie in loaded.cookies} == {'session': 'abc'}
+
+
+def test_stores_are_per_login(tmp_path):
+    session = requests.Session()
+    session.cookies.set('session', 'abc')
+    CookieStore(str(tmp_path), 'user').save(session)
+
+    assert not CookieStore(str(tmp_path), 'other').load(requests.Session())
+
+
+def test_clear(tmp_path):
+    store = CookieStore(str(tmp_path), 'user')
+    session = requests.Session()
+    session.cookies.set('session', 'abc')
+    store.save(session)
+
+    store.clear()
+    store.clear()
+    assert not store.load(requests.Session())
+
+
+def test_touch_refreshes_saved_time(tmp_path):
+    store = CookieStore(str(tmp_path), 'user', max_age=100)
+    session = requests.Session()
+    session.cookies.set('session', 'abc')
+    store.save(session)
+
+    # Rewritten at most once per tenth of max_age
+    saved = saved_time(store)
+    store.touch(session)
+    assert saved_time(store) == saved
+
+    store.max_age = 0
+    store.touch(session)
+    assert saved_time(store) > saved
+
+
+def test_session_reuse_between_runs(portal_port, portal_stats, tmp_path):
+    benchmark.local_scraper(portal_port, cookie_store=CookieStore(str(tmp_path), benchmark.LOGIN)) \
+        .get_day_data(year=2024, month=2, day=14)
+    logins = portal_stats()['logins']
+
+    scraper = benchmark.local_scraper(portal_port, cookie_store=CookieStore(str(tmp_path), benchmark.LOGIN))
+    assert len(scraper.get_day_data(year=2024, month=2, day=14)['A+']) == 24
+    assert portal_stats()['logins'] == logins == 1
+
+
+def test_stale_session_logs_in(portal_port, portal_stats, tmp_path):
+    benchmark.local_scraper(portal_port, cookie_store=CookieStore(str(tmp_path), benchmark.LOGIN)) \
+        .get_day_data(year=2024, month=2, day=14)
+
+    scraper = benchmark.local_scraper(portal_port,
+                                      cookie_store=CookieStore(str(tmp_path), benchmark.LOGIN, max_age=-1))
+    assert len(scraper.get_day_data(year=2024, month=2, day=14)['A+']) == 24
+    assert portal_stats()['logins'] == 2
+
+
+def test_used_session_stays_valid(portal_port, portal_stats, tmp_path):
+    def run():
+        scraper = benchmark.local_scraper(portal_port,
+                                          cookie_store=CookieStore(str(tmp_path), benchmark.LOGIN, max_age=0.5))
+        scraper.get_day_data(year=2024, month=2, day=14)
+
+    # Each run is within max_age of the previous one but not of the login
+    for _ in range(4):
+        run()
+        time.sleep(0.3)
+
+    assert portal_stats()['logins'] == 1
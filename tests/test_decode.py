@@ -0,0 +1,76 @@
+"""
+Chart json decoding and formatting tests
+"""
+
+import json
+from urllib.parse import urlencode
+
+import pytest
+
+from main import MemoryCache, STScraper
+
+CHART = {
+    'values': {
+        'A+': {'total': {'data': [{'timestamp': 1707868800000, 'value': 0.125},
+                                  {'timestamp': 1707872400000, 'value': None}]}, 'label': 'A+'},
+        'A-': {'total': {'data': [{'timestamp': 1707868800000, 'value': 0.0},
+                                  {'timestamp': 1707872400000, 'value': 0.05}]}}
+    },
+    'labels': ['00:00', '01:00']
+}
+
+RECORDS = {
+    'A+': [{'data': '2024-02-14 00:00:00', 'value': 0.125}, {'data': '2024-02-14 01:00:00', 'value': None}],
+    'A-': [{'data': '2024-02-14 00:00:00', 'value': 0.0}, {'data': '2024-02-14 01:00:00', 'value': 0.05}]
+}
+
+
+def make_scraper(**kwargs):
+    """
+    Create scraper that is not used for requests
+    """
+    return STScraper('user', 'secret', '40X000000000000X', '12345678', **kwargs)
+
+
+def test_decode_columns():
+    assert make_scraper()._decode_chart(json.dumps(CHART)) == {  # pylint: disable=protected-access
+        'A+': [[1707868800000, 1707872400000], [0.125, None]],
+        'A-': [[1707868800000, 1707872400000], [0.0, 0.05]]
+    }
+
+
+def test_decode_without_neto():
+    chart = {'values': {'A+': CHART['values']['A+']}}
+    scraper = make_scraper()
+
+    decoded = scraper._decode_chart(json.dumps(chart))  # pylint: disable=protected-access
+    assert list(decoded) == ['A+']
+    assert scraper._format_response(decoded) == RECORDS['A+']  # pylint: disable=protected-access
+
+
+def test_format_records():
+    scraper = make_scraper()
+    decoded = scraper._decode_chart(json.dumps(CHART))  # pylint: disable=protected-access
+
+    assert scraper._format_response(decoded) == RECORDS  # pylint: disable=protected-access
+    assert scraper._format_response(decoded, neto=False) == RECORDS['A+']  # pylint: disable=protected-access
+
+
+def test_format_series():
+    pytest.importorskip('numpy')
+    scraper = make_scraper(as_series=True)
+
+    series = scraper._format_response(scraper._decode_chart(json.dumps(CHART)))  # pylint: disable=protected-access
+    assert series.timestamps.tolist() == [1707868800000, 1707872400000]
+    assert series.to_records() == RECORDS
+
+
+def test_graph_json_cache_entry():
+    cache = MemoryCache()
+    scraper = make_scraper(cache=cache)
+    params = scraper._get_data_params(STScraper.PERIOD_DAY, '2024', '02', '14',  # pylint: disable=protected-access
+                                      STScraper.GRANULARITY_HOUR)
+    # Entry in the format of earlier versions, which cached the whole graph json
+    cache.set(urlencode(sorted(params.items())), CHART, True)
+
+    assert scraper.get_day_data(year='2024', month='02', day='14') == RECORDS
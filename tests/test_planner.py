@@ -0,0 +1,116 @@
+"""
+RequestPlanner tests
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from main import RequestPlanner, STScraper
+
+HOUR = STScraper.GRANULARITY_HOUR
+DAY = STScraper.GRANULARITY_DAY
+YEAR, MONTH, ONE_DAY = STScraper.PERIOD_YEAR, STScraper.PERIOD_MONTH, STScraper.PERIOD_DAY
+
+
+def cover(start, end, periods, granularity=HOUR):
+    """
+    Get (period, year, month, day) of requests covering the range
+    """
+    plan = RequestPlanner()._cover(start, end, granularity, periods)  # pylint: disable=protected-access
+    return [(params['period'], params['year'], params.get('month'), params.get('day')) for params in plan]
+
+
+class Portal:
+    """
+    Fetch stand-in returning timestamps of given step for each period and counting requests
+    """
+
+    def __init__(self, steps, error=None):
+        self.steps = steps
+        self.error = error
+        self.calls = []
+
+    def __call__(self, period, granularity, year, month=None, day=None):
+        self.calls.append(period)
+        if self.error:
+            raise self.error
+
+        first = datetime(int(year), int(month or 1), int(day or 1), tzinfo=timezone.utc)
+        step = self.steps[period]
+        timestamps = [int((first + timedelta(seconds=step * number)).timestamp() * 1000) for number in range(3)]
+        return {'A+': [timestamps, [0.1] * 3]}
+
+
+def test_cover_days():
+    assert cover(date(2024, 2, 14), date(2024, 2, 14), [YEAR, MONTH, ONE_DAY]) == \
+        [(ONE_DAY, '2024', '02', '14')]
+    assert cover(date(2023, 12, 31), date(2024, 1, 1), [YEAR, MONTH, ONE_DAY]) == \
+        [(ONE_DAY, '2023', '12', '31'), (ONE_DAY, '2024', '01', '01')]
+
+
+def test_cover_longer_periods():
+    assert cover(date(2024, 1, 30), date(2024, 3, 2), [MONTH, ONE_DAY]) == \
+        [(MONTH, '2024', '01', None), (MONTH, '2024', '02', None), (MONTH, '2024', '03', None)]
+    assert cover(date(2024, 1, 30), date(2024, 3, 2), [YEAR, MONTH, ONE_DAY]) == \
+        [(YEAR, '2024', None, None)]
+    assert cover(date(2023, 12, 1), date(2024, 12, 31), [YEAR, MONTH], DAY) == \
+        [(MONTH, '2023', '12', None), (YEAR, '2024', None, None)]
+
+
+def test_probing(tmp_path):
+    path = str(tmp_path / 'plan.json')
+    portal = Portal({YEAR: 30 * 86400, MONTH: 3600})
+
+    plan = RequestPlanner(path).plan(date(2024, 1, 1), date(2024, 2, 29), HOUR, portal)
+    assert [params['period'] for params in plan] == [MONTH, MONTH]
+    assert portal.calls == [YEAR, MONTH]
+
+    # Probed combinations are remembered between runs
+    planner = RequestPlanner(path)
+    assert planner.is_supported(YEAR, HOUR) is False
+    assert planner.is_supported(MONTH, HOUR) is True
+    assert planner.plan(date(2024, 1, 1), date(2024, 2, 29), HOUR, portal) == plan
+    assert portal.calls == [YEAR, MONTH]
+
+
+def test_unknown_combinations_without_fetch():
+    plan = RequestPlanner().plan(date(2024, 2, 1), date(2024, 2, 3), HOUR)
+    assert [params['period'] for params in plan] == [ONE_DAY] * 3
+
+
+def test_probe_with_too_few_points():
+    portal = Portal({YEAR: 30 * 86400, MONTH: 3600})
+    planner = RequestPlanner()
+
+    def fetch(**kwargs):
+        response = portal(**kwargs)
+        return {'A+': [response['A+'][0][:1], [0.1]]}
+
+    assert len(planner.plan(date(2024, 2, 1), date(2024, 2, 3), HOUR, fetch)) == 3
+    assert planner.supported == {}
+
+
+def test_probe_errors():
+    requests = pytest.importorskip('requests')
+
+    def http_error(status):
+        response = requests.Response()
+        response.status_code = status
+        return requests.HTTPError(response=response)
+
+    planner = RequestPlanner()
+    planner.plan(date(2024, 2, 1), date(2024, 2, 3), HOUR, Portal({}, http_error(404)))
+    assert planner.supported == {f'{YEAR}:{HOUR}': False, f'{MONTH}:{HOUR}': False}
+
+    with pytest.raises(requests.HTTPError):
+        RequestPlanner().plan(date(2024, 2, 1), date(2024, 2, 3), HOUR, Portal({}, http_error(503)))
+
+
+def test_estimate():
+    planner = RequestPlanner()
+    planner.request_time = 2.0
+
+    assert planner.estimate(0) == 0.0
+    assert planner.estimate(9, max_workers=4) == 6.0
+    assert planner.estimate(9, max_workers=4, rate=1) == 9.0
@@ -0,0 +1,101 @@
+"""
+DayPoller tests
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from main import DayPoller, SQLiteStore, STScraper
+
+TODAY = date.today()
+YESTERDAY = TODAY - timedelta(days=1)
+
+
+class PublishingScraper:
+    """
+    Scraper stand-in serving readings published so far, by day
+    """
+
+    object_id = '40X000000000001X'
+    meter_id = '12345678'
+
+    def __init__(self):
+        self.published = {YESTERDAY: {}, TODAY: {}}
+        self.fail = False
+
+    def publish(self, day, hour, value):
+        self.published[day][hour] = value
+
+    def get_day_data(self, neto, year, month, day):
+        day = date(int(year), int(month), int(day))
+        if self.fail and day == TODAY:
+            raise ConnectionError('Portal is down')
+
+        items = [{'data': f'{day} {hour:02}:00:00', 'value': self.published[day].get(hour)}
+                 for hour in range(24)]
+        return {'A+': items, 'A-': [dict(item, value=0.0 if item['value'] is not None else None)
+                                    for item in items]} if neto else items
+
+
+def values(data):
+    """
+    Get (timestamp, value) pairs of A+ readings
+    """
+    return [(item['data'], item['value']) for item in (data['A+'] if isinstance(data, dict) else data)]
+
+
+def test_returns_only_new_readings():
+    scraper = PublishingScraper()
+    scraper.publish(YESTERDAY, 23, 0.5)
+    scraper.publish(TODAY, 0, 0.25)
+    poller = DayPoller(scraper)
+
+    assert values(poller.poll()) == [(f'{YESTERDAY} 23:00:00', 0.5), (f'{TODAY} 00:00:00', 0.25)]
+    assert poller.poll() == {'A+': [], 'A-': []}
+
+    scraper.publish(TODAY, 1, 0.125)
+    new = poller.poll()
+    assert values(new) == [(f'{TODAY} 01:00:00', 0.125)]
+    assert new['A-'] == [{'data': f'{TODAY} 01:00:00', 'value': 0.0}]
+
+
+def test_changed_values_are_returned():
+    scraper = PublishingScraper()
+    scraper.publish(TODAY, 0, 0.25)
+    poller = DayPoller(scraper, neto=False)
+    poller.poll()
+
+    scraper.publish(TODAY, 0, 0.3)
+    assert values(poller.poll()) == [(f'{TODAY} 00:00:00', 0.3)]
+
+
+def test_failed_poll_is_repeated():
+    scraper = PublishingScraper()
+    poller = DayPoller(scraper, neto=False)
+    poller.poll()
+
+    scraper.publish(YESTERDAY, 23, 0.5)
+    scraper.fail = True
+    with pytest.raises(ConnectionError):
+        poller.poll()
+
+    scraper.fail = False
+    assert values(poller.poll()) == [(f'{YESTERDAY} 23:00:00', 0.5)]
+
+
+def test_stored_readings_are_not_returned_again():
+    store = SQLiteStore(':memory:')
+    scraper = PublishingScraper()
+    scraper.publish(TODAY, 0, 0.25)
+    store.save(scraper.meter_id, DayPoller(scraper).poll(), STScraper.GRANULARITY_HOUR, scraper.object_id)
+
+    # Restarted poller skips readings stored by the previous run
+    scraper.publish(TODAY, 1, 0.125)
+    assert values(DayPoller(scraper, store=store).poll()) == [(f'{TODAY} 01:00:00', 0.125)]
+
+    # Readings stored for another object with the same meter ID do not count
+    other = PublishingScraper()
+    other.object_id = '40X000000000002X'
+    other.publish(TODAY, 0, 0.25)
+    assert values(DayPoller(other, store=store).poll()) == [(f'{TODAY} 00:00:00', 0.25)]
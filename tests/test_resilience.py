@@ -0,0 +1,111 @@
+"""
+Retry and circuit breaker tests
+"""
+
+import socket
+import time
+from urllib.parse import urlsplit
+
+import pytest
+
+import benchmark
+from main import CircuitOpenError, ResiliencePolicy, STScraper
+
+requests = pytest.importorskip('requests')
+pytest.importorskip('pyquery')
+
+
+def scraper_at(host, data_path=urlsplit(STScraper.DATA_URL).path, **kwargs):
+    """
+    Create scraper of given portal host
+    """
+    scraper_class = type('LocalSTScraper', (STScraper,), {
+        'BASE_HOST': host,
+        'LOGIN_URL': host + urlsplit(STScraper.LOGIN_URL).path,
+        'DATA_URL': host + data_path
+    })
+    return scraper_class(benchmark.LOGIN, benchmark.PASSWORD, benchmark.OBJECT_ID, benchmark.METER_ID,
+                         **kwargs)
+
+
+@pytest.fixture(name='closed_host')
+def fixture_closed_host():
+    """
+    Get url of a port nothing listens on
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f'http://127.0.0.1:{sock.getsockname()[1]}'
+
+
+def response_error(status):
+    """
+    Create http error of the response status
+    """
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+def test_retryable_errors():
+    policy = ResiliencePolicy()
+
+    assert policy.is_retryable(requests.ConnectionError())
+    assert policy.is_retryable(requests.Timeout())
+    assert all(policy.is_retryable(response_error(status)) for status in ResiliencePolicy.RETRY_STATUSES)
+    assert not policy.is_retryable(response_error(404))
+    assert not policy.is_retryable(requests.TooManyRedirects())
+
+
+def test_backoff_delay():
+    policy = ResiliencePolicy(backoff=1.0, max_backoff=5.0)
+
+    for attempt, limit in enumerate([1, 2, 4, 5, 5]):
+        assert all(0 <= policy.get_delay(attempt) <= limit for _ in range(100))
+
+
+def test_connection_errors_are_retried(closed_host):
+    policy = ResiliencePolicy(retries=2, backoff=0.001)
+
+    with pytest.raises(requests.ConnectionError):
+        scraper_at(closed_host, resilience=policy).get_day_data(year=2024, month=2, day=14)
+    assert policy._failures == 3  # pylint: disable=protected-access
+
+
+def test_timeouts_are_retried(portal_port, portal_stats, monkeypatch):
+    monkeypatch.setattr(benchmark.MockPortalHandler, 'latency', 0.3)
+    policy = ResiliencePolicy(read_timeout=0.05, retries=1, backoff=0.001)
+
+    with pytest.raises(requests.Timeout):
+        scraper_at(f'http://127.0.0.1:{portal_port}', resilience=policy).get_day_data(year=2024, month=2, day=14)
+    assert portal_stats()['get'] == 2
+
+
+def test_client_errors_are_not_retried(portal_port, portal_stats):
+    policy = ResiliencePolicy(backoff=0.001)
+
+    with pytest.raises(requests.HTTPError):
+        scraper_at(f'http://127.0.0.1:{portal_port}', '/missing', resilience=policy) \
+            .get_day_data(year=2024, month=2, day=14)
+    assert portal_stats()['get'] == 1
+    assert policy._failures == 0  # pylint: disable=protected-access
+
+
+def test_circuit_breaker(closed_host, portal_port):
+    policy = ResiliencePolicy(retries=10, backoff=0.001, failure_threshold=3, reset_timeout=0.3)
+    scraper = scraper_at(closed_host, resilience=policy)
+
+    # Retries stop once the circuit opens, and further requests fail fast
+    with pytest.raises(CircuitOpenError):
+        scraper.get_day_data(year=2024, month=2, day=14)
+    assert policy._failures == 3  # pylint: disable=protected-access
+
+    healthy = scraper_at(f'http://127.0.0.1:{portal_port}', resilience=policy)
+    with pytest.raises(CircuitOpenError):
+        healthy.get_day_data(year=2024, month=2, day=14)
+
+    # Requests are tried again after reset timeout, success closes the circuit
+    time.sleep(0.3)
+    assert len(healthy.get_day_data(year=2024, month=2, day=14)['A+']) == 24
+    assert policy._failures == 0  # pylint: disable=protected-access
+    policy.check()
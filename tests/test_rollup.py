@@ -0,0 +1,59 @@
+"""
+Rollup tests
+"""
+
+from datetime import date
+
+import pytest
+
+from main import SQLiteStore, STScraper, rollup
+
+pytest.importorskip('numpy')
+
+HOURS = {
+    'A+': [{'data': '2024-01-31 22:00:00', 'value': 0.5}, {'data': '2024-01-31 23:00:00', 'value': 0.25},
+           {'data': '2024-02-01 00:00:00', 'value': 0.1}, {'data': '2024-02-01 01:00:00', 'value': 0.2}],
+    'A-': [{'data': '2024-01-31 22:00:00', 'value': None}, {'data': '2024-01-31 23:00:00', 'value': None},
+           {'data': '2024-02-01 00:00:00', 'value': 0.0}, {'data': '2024-02-01 01:00:00', 'value': 0.3}]
+}
+
+
+def test_rollup_days():
+    assert rollup(HOURS, 'day') == {
+        'A+': [{'data': '2024-01-31 00:00:00', 'value': 0.75}, {'data': '2024-02-01 00:00:00', 'value': 0.3}],
+        # Periods without any values stay None
+        'A-': [{'data': '2024-01-31 00:00:00', 'value': None}, {'data': '2024-02-01 00:00:00', 'value': 0.3}]
+    }
+
+
+def test_rollup_months_and_years():
+    assert rollup(HOURS['A+'], 'month') == [{'data': '2024-01-01 00:00:00', 'value': 0.75},
+                                            {'data': '2024-02-01 00:00:00', 'value': 0.3}]
+    assert rollup(HOURS['A+'], 'year') == [{'data': '2024-01-01 00:00:00', 'value': 1.05}]
+
+
+def test_rollup_invalid_unit():
+    with pytest.raises(ValueError):
+        rollup(HOURS, 'week')
+
+
+def test_store_rollup():
+    store = SQLiteStore(':memory:')
+    store.save('12345678', HOURS, STScraper.GRANULARITY_HOUR, '40X000000000001X')
+
+    assert store.rollup('12345678', 'month') == rollup(HOURS, 'month')
+    assert store.rollup('12345678', 'day', start=date(2024, 2, 1)) == {
+        'A+': [{'data': '2024-02-01 00:00:00', 'value': 0.3}],
+        'A-': [{'data': '2024-02-01 00:00:00', 'value': 0.3}]
+    }
+    assert store.rollup('12345678', 'day', neto=False, end=date(2024, 1, 31)) == \
+        [{'data': '2024-01-31 00:00:00', 'value': 0.75}]
+
+
+def test_store_rollup_without_neto_data():
+    store = SQLiteStore(':memory:')
+    store.save('12345678', HOURS['A+'], STScraper.GRANULARITY_HOUR)
+
+    # No empty A- totals for meters without A- data
+    assert store.rollup('12345678', 'year') == [{'data': '2024-01-01 00:00:00', 'value': 1.05}]
+    assert store.rollup('87654321', 'year') == {'A+': [], 'A-': []}
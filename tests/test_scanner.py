@@ -0,0 +1,77 @@
+"""
+Html scanner tests against PyQuery parsing
+"""
+
+import html
+import json
+
+import pytest
+
+from main import _scan_chart_values, _scan_input_values
+
+PyQuery = pytest.importorskip('pyquery').PyQuery
+
+CHART = json.dumps({'values': {'A+': {'total': {'data': [{'timestamp': 1707868800000, 'value': 0.125}]}}},
+                    'label': "Patēriņš <kWh> & 'cena'"})
+
+CHART_PAGES = {
+    'double quoted': f'<div class="chart" data-values="{html.escape(CHART)}"></div>',
+    'single quoted': f"<div class='chart' data-values='{html.escape(CHART, quote=False)}'></div>",
+    'single quoted with raw double quotes': f"<div class='chart' data-values='{CHART.replace(chr(39), '')}'></div>",
+    'unquoted': '<div class=chart data-values=[1,2,3]></div>',
+    'numeric entities': '<div class="chart" data-values="{&#34;a&#34;:&#x27;b&#x27;,&#39;c&#039;:1}"></div>',
+    'named entities': '<div class="chart" data-values="&lt;&eacute;&nbsp;&amp;amp;&gt;"></div>',
+    'bare ampersand': '<div class="chart" data-values="a & b &amp; c"></div>',
+    'several classes': '<div id="x" class="col chart wide" data-values="[1]"></div>',
+    'uppercase': '<DIV CLASS="chart" DATA-VALUES="[1]"></DIV>',
+    'spaces around equals': '<div class = "chart" data-values = "[1]" ></div>',
+    'other div first': '<div class="legend" data-values="[0]"></div><div class="chart" data-values="[1]"></div>',
+    'chart-like class': '<div class="charts" data-values="[0]"></div><div class="chart" data-values="[1]"></div>',
+    'angle bracket in attribute': '<div title="a > b" class="chart" data-values="[1]"></div>',
+    'text mentions data-values': '<p>data-values</p><div class="chart" data-values="[1]"></div>',
+    'no chart': '<form><input name="login" value=""></form>',
+}
+
+INPUT_PAGES = {
+    'double quoted': '<input type="hidden" name="_token" value="abc123">'
+                     '<input type="hidden" name="returnUrl" value="/lv/?a=1&amp;b=2">',
+    'single quoted': "<input type='hidden' name='_token' value='a\"b'><input name='returnUrl' value='/x'>",
+    'unquoted': '<input type=hidden name=_token value=abc123><input name=returnUrl value=/lv/private/>',
+    'entities': '<input name="_token" value="&lt;&#39;&quot;&eacute;&gt;"><input name="returnUrl" value="&#x2F;">',
+    'attribute order': '<input value="abc" name="_token"><INPUT VALUE="/y" NAME="returnUrl">',
+    'self closing': '<input name="_token" value="abc"/><input name="returnUrl" value="/z" />',
+    'missing input': '<input name="_token" value="abc">',
+    'empty value': '<input name="_token" value=""><input name="returnUrl" value="">',
+}
+
+
+def page(body):
+    """
+    Wrap html fragment into a page
+    """
+    return f'<!DOCTYPE html><html><head><title>Mans e-ST</title></head><body>{body}</body></html>'
+
+
+@pytest.mark.parametrize('body', CHART_PAGES.values(), ids=CHART_PAGES.keys())
+def test_chart_values(body):
+    text = page(body)
+    assert _scan_chart_values(text) == PyQuery(text)('div.chart').attr('data-values')
+
+
+@pytest.mark.parametrize('body', INPUT_PAGES.values(), ids=INPUT_PAGES.keys())
+def test_input_values(body):
+    text = page(body)
+    fields = ('_token', 'returnUrl')
+
+    expected = {}
+    for field in fields:
+        inputs = PyQuery(text)(f'input[name="{field}"]')
+        if inputs:
+            expected[field] = inputs.attr('value')
+
+    assert _scan_input_values(text, fields) == expected
+
+
+def test_chart_json_decodes():
+    text = page(CHART_PAGES['double quoted'])
+    assert json.loads(_scan_chart_values(text)) == json.loads(CHART)
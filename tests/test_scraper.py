@@ -0,0 +1,76 @@
+"""
+STScraper login and session reuse tests against the mock portal
+"""
+
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import benchmark
+
+pytest.importorskip('requests')
+pytest.importorskip('pyquery')
+
+
+def assert_day_data(data):
+    """
+    Check hourly data of a day in A+ and A- directions
+    """
+    assert list(data) == ['A+', 'A-']
+    assert [item['data'] for item in data['A+']] == [f'2024-02-14 {hour:02}:00:00' for hour in range(24)]
+    assert data['A+'][1]['value'] == 0.125
+
+
+def test_login_bounce(portal_port, portal_stats):
+    scraper = benchmark.local_scraper(portal_port)
+
+    assert_day_data(scraper.get_day_data(year=2024, month=2, day=14))
+    # Data page bounced to the login form, the form requested again under the login lock,
+    # login redirected to the data page
+    assert portal_stats() == {'get': 3, 'post': 1, 'logins': 1}
+
+
+def test_session_reuse(portal_port, portal_stats):
+    scraper = benchmark.local_scraper(portal_port)
+    scraper.get_day_data(year=2024, month=2, day=14)
+
+    assert_day_data(scraper.get_day_data(year=2024, month=2, day=14))
+    assert len(scraper.get_month_data(year=2024, month=2)['A+']) == 29
+    assert portal_stats() == {'get': 5, 'post': 1, 'logins': 1}
+
+
+def test_wrong_password(portal_port, portal_stats):
+    scraper = benchmark.local_scraper(portal_port)
+    scraper.password = 'wrong'
+
+    with pytest.raises(ValueError, match='check login credentials'):
+        scraper.get_day_data(year=2024, month=2, day=14)
+    assert portal_stats()['logins'] == 0
+
+
+def test_concurrent_bounces_share_login(portal_port, portal_stats):
+    scraper = benchmark.local_scraper(portal_port)
+
+    data = scraper.get_range_data(date(2024, 2, 1), date(2024, 2, 10), max_workers=5)
+
+    assert len(data['A+']) == 10 * 24
+    assert portal_stats()['logins'] == 1
+
+
+@pytest.mark.parametrize('threads', [4, 16])
+def test_concurrent_cold_start(portal_port, portal_stats, threads):
+    scraper = benchmark.local_scraper(portal_port)
+    barrier = threading.Barrier(threads)
+
+    def fetch(day):
+        barrier.wait()
+        return scraper.get_day_data(year=2024, month=2, day=day)
+
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(fetch, range(1, threads + 1)))
+
+    assert [result['A+'][0]['data'] for result in results] == \
+        [f'2024-02-{day:02} 00:00:00' for day in range(1, threads + 1)]
+    assert portal_stats()['logins'] == 1
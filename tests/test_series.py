@@ -0,0 +1,71 @@
+"""
+MeterSeries results in storage, output and polling tests
+"""
+
+import io
+import json
+from datetime import date
+
+import pytest
+
+import benchmark
+from main import DayPoller, MeterSeries, SQLiteStore, write_ndjson, write_table
+
+np = pytest.importorskip('numpy')
+
+RECORDS = {
+    'A+': [{'data': '2024-02-14 00:00:00', 'value': 0.125}, {'data': '2024-02-14 01:00:00', 'value': None}],
+    'A-': [{'data': '2024-02-14 00:00:00', 'value': 0.0}, {'data': '2024-02-14 01:00:00', 'value': 0.05}]
+}
+
+
+def test_records_roundtrip():
+    series = MeterSeries.from_records(RECORDS)
+
+    assert series.timestamps.tolist() == [1707868800000, 1707872400000]
+    assert np.isnan(series.values['A+'][1])
+    assert series.to_records() == RECORDS
+    assert MeterSeries.from_records(RECORDS['A+']).to_records() == RECORDS['A+']
+
+
+def test_store_save():
+    store = SQLiteStore(':memory:')
+
+    assert store.save('m', MeterSeries.from_records(RECORDS), 'H') == 4
+    assert store.load('m', 'H') == RECORDS
+
+
+def test_write_ndjson():
+    output = io.StringIO()
+    write_ndjson(MeterSeries.from_records(RECORDS), 'm', output)
+
+    assert [json.loads(line) for line in output.getvalue().splitlines()][:2] == [
+        {'meter': 'm', 'direction': 'A+', 'timestamp': '2024-02-14 00:00:00', 'value': 0.125},
+        {'meter': 'm', 'direction': 'A+', 'timestamp': '2024-02-14 01:00:00', 'value': None}
+    ]
+
+
+def test_day_poller(portal_port):
+    pytest.importorskip('requests')
+    poller = DayPoller(benchmark.local_scraper(portal_port, as_series=True), days=1)
+
+    data = poller.poll()
+    assert [item['data'][:10] for item in data['A+']] == [date.today().isoformat()] * 24
+    assert poller.poll() == {'A+': [], 'A-': []}
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'arrow'])
+def test_write_table(tmp_path, file_format):
+    pyarrow = pytest.importorskip('pyarrow')
+    pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / f'data.{file_format}')
+
+    write_table({'m': MeterSeries.from_records(RECORDS)}, path, file_format)
+
+    if file_format == 'parquet':
+        table = pyarrow.parquet.read_table(path)
+    else:
+        with pyarrow.memory_map(path) as source:
+            table = pyarrow.ipc.open_file(source).read_all()
+    assert table.column('timestamp').to_pylist() == [1707868800000, 1707872400000] * 2
+    assert table.column('value').to_pylist() == [0.125, None, 0.0, 0.05]
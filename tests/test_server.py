@@ -0,0 +1,125 @@
+"""
+DataServer tests against the mock portal
+"""
+
+import json
+import threading
+from datetime import date
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import benchmark
+from main import DataServer, MemoryCache, SQLiteStore, STAccount, STScraper
+
+pytest.importorskip('requests')
+pytest.importorskip('pyquery')
+
+OBJECTS = ['40X000000000001X', '40X000000000002X']
+
+
+@pytest.fixture
+def account(portal_port, monkeypatch):
+    """
+    Account with scrapers using the mock portal
+    """
+    host = f'http://127.0.0.1:{portal_port}'
+    monkeypatch.setattr(STScraper, 'BASE_HOST', host)
+    monkeypatch.setattr(STScraper, 'LOGIN_URL', host + urlsplit(STScraper.LOGIN_URL).path)
+    monkeypatch.setattr(STScraper, 'DATA_URL', host + urlsplit(STScraper.DATA_URL).path)
+
+    return STAccount(benchmark.LOGIN, benchmark.PASSWORD, cache=MemoryCache())
+
+
+@pytest.fixture
+def server(account):
+    """
+    Run http api of two objects with the same meter ID and another meter, get its url
+    """
+    api = DataServer(account, [(OBJECTS[0], benchmark.METER_ID), (OBJECTS[1], benchmark.METER_ID),
+                               (OBJECTS[0], '87654321')], store=SQLiteStore(':memory:'))
+    http_server = api.serve(0)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+
+    yield api, f'http://127.0.0.1:{http_server.server_address[1]}'
+
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def get(url):
+    """
+    Get status and json body of the url
+    """
+    try:
+        with urlopen(url, timeout=30) as response:
+            return response.status, json.load(response)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_concurrent_first_requests(server, portal_stats):
+    _, url = server
+
+    def fetch(day):
+        return get(f'{url}/meters/87654321/day?year=2024&month=02&day={day}')
+
+    with ThreadPoolExecutor(12) as executor:
+        results = list(executor.map(fetch, range(1, 13)))
+
+    assert [status for status, _ in results] == [200] * 12
+    assert [body['A+'][0]['data'] for _, body in results] == \
+        [f'2024-02-{day:02} 00:00:00' for day in range(1, 13)]
+    assert portal_stats()['logins'] == 1
+
+
+def test_login_failure_is_bad_gateway(server):
+    api, url = server
+    for scraper in api.scrapers.values():
+        scraper.password = 'wrong'
+
+    status, body = get(f'{url}/meters/87654321/day?year=2024&month=02&day=14')
+    assert status == 502
+    assert 'login' in body['error']
+
+
+def test_meter_errors(server):
+    _, url = server
+
+    assert get(f'{url}/meters/{benchmark.METER_ID}/day?year=2024&month=02&day=14')[0] == 400
+    assert get(f'{url}/meters/11111111/day?year=2024&month=02&day=14')[0] == 404
+    assert get(f'{url}/meters/87654321/week')[0] == 404
+    assert get(f'{url}/meters/87654321/range?start=2024-01-01')[0] == 400
+
+
+def test_stored_data_of_same_meter_id(server, portal_stats):
+    api, url = server
+    stored = {'A+': [{'data': f'2024-02-14 {hour:02}:00:00', 'value': 9.0} for hour in range(24)],
+              'A-': [{'data': f'2024-02-14 {hour:02}:00:00', 'value': 0.0} for hour in range(24)]}
+    api.store.save(benchmark.METER_ID, stored, STScraper.GRANULARITY_HOUR, OBJECTS[0])
+
+    status, body = get(f'{url}/meters/{OBJECTS[0]}:{benchmark.METER_ID}/day?year=2024&month=02&day=14')
+    assert (status, body) == (200, stored)
+    assert portal_stats()['get'] == 0
+
+    # Another object's meter with the same ID is retrieved from the portal and stored separately
+    status, body = get(f'{url}/meters/{OBJECTS[1]}:{benchmark.METER_ID}/day?year=2024&month=02&day=14')
+    assert status == 200
+    assert body['A+'][1]['value'] == 0.125
+    assert api.store.load(benchmark.METER_ID, STScraper.GRANULARITY_HOUR, object_id=OBJECTS[1],
+                          start=date(2024, 2, 14), end=date(2024, 2, 14)) == body
+    assert api.store.load(benchmark.METER_ID, STScraper.GRANULARITY_HOUR, object_id=OBJECTS[0]) == stored
+
+
+def test_series_account(account, portal_stats):
+    pytest.importorskip('numpy')
+    account.as_series = True
+    api = DataServer(account, [(OBJECTS[0], benchmark.METER_ID)], store=SQLiteStore(':memory:'))
+
+    data = api.get_data(benchmark.METER_ID, 'day', {'year': '2024', 'month': '02', 'day': '14'})
+    assert json.loads(json.dumps(data))['A+'][1] == {'data': '2024-02-14 01:00:00', 'value': 0.125}
+    assert api.get_data(benchmark.METER_ID, 'day', {'year': '2024', 'month': '02', 'day': '14'}) == data
+    assert portal_stats()['logins'] == 1
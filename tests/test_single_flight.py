@@ -0,0 +1,71 @@
+"""
+SingleFlight tests
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from main import SingleFlight
+
+
+def test_concurrent_calls_share_result():
+    flight = SingleFlight()
+    calls = []
+
+    def function():
+        calls.append(1)
+        time.sleep(0.2)
+        return object()
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: flight.do('key', function), range(8)))
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_different_keys_do_not_share():
+    flight = SingleFlight()
+    barrier = threading.Barrier(2, timeout=5)
+
+    def function(key):
+        # Both calls have to be in flight at the same time to pass the barrier
+        barrier.wait()
+        return key
+
+    with ThreadPoolExecutor(2) as executor:
+        assert list(executor.map(lambda key: flight.do(key, lambda: function(key)), 'ab')) == ['a', 'b']
+
+
+def test_finished_calls_are_not_shared():
+    flight = SingleFlight()
+    calls = []
+
+    assert flight.do('key', lambda: calls.append(1) or len(calls)) == 1
+    assert flight.do('key', lambda: calls.append(1) or len(calls)) == 2
+
+
+def test_error_is_raised_to_all_callers():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def function():
+        started.set()
+        time.sleep(0.2)
+        raise ValueError('failed')
+
+    def follower():
+        started.wait()
+        return flight.do('key', function)
+
+    with ThreadPoolExecutor(2) as executor:
+        futures = [executor.submit(flight.do, 'key', function), executor.submit(follower)]
+        for future in futures:
+            with pytest.raises(ValueError, match='failed'):
+                future.result()
+
+    # Key is released after the failure
+    assert flight.do('key', lambda: 'ok') == 'ok'
@@ -0,0 +1,73 @@
+"""
+SQLiteStore tests
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from main import SQLiteStore, STScraper
+
+HOUR = STScraper.GRANULARITY_HOUR
+
+
+class RangeScraper:
+    """
+    Scraper stand-in returning two readings of each requested day
+    """
+
+    def __init__(self, object_id='40X000000000001X', meter_id='12345678'):
+        self.object_id = object_id
+        self.meter_id = meter_id
+        self.calls = []
+
+    def get_range_data(self, start, end, granularity, neto, max_workers):
+        self.calls.append((start, end, granularity))
+        days = [start + timedelta(days) for days in range((end - start).days + 1)]
+        items = [{'data': f'{day} {hour:02}:00:00', 'value': 0.5} for day in days for hour in (0, 23)]
+        return {'A+': items, 'A-': [dict(item, value=0.0) for item in items]} if neto else items
+
+
+def test_initial_sync_requires_start():
+    with pytest.raises(TypeError):
+        SQLiteStore(':memory:').sync(RangeScraper())
+
+
+def test_incremental_sync():
+    store = SQLiteStore(':memory:')
+    scraper = RangeScraper()
+    today = date.today()
+
+    data = store.sync(scraper, HOUR, today - timedelta(days=3))
+    assert scraper.calls == [(today - timedelta(days=3), today, HOUR)]
+    assert store.load(scraper.meter_id, HOUR) == data
+    assert store.get_last_timestamp(scraper.meter_id, HOUR, scraper.object_id) == f'{today} 23:00:00'
+
+    # Next sync starts at the last stored day, ignoring start
+    store.connection.execute('DELETE FROM readings WHERE timestamp >= ?', (str(today),))
+    store.sync(scraper, HOUR, today - timedelta(days=30))
+    assert scraper.calls[1] == (today - timedelta(days=1), today, HOUR)
+    assert len(store.load(scraper.meter_id, HOUR)['A+']) == 8
+
+
+def test_sync_start_is_per_object():
+    store = SQLiteStore(':memory:')
+    today = date.today()
+    store.sync(RangeScraper(), HOUR, today - timedelta(days=3))
+
+    scraper = RangeScraper('40X000000000002X')
+    store.sync(scraper, HOUR, today - timedelta(days=1))
+    assert scraper.calls == [(today - timedelta(days=1), today, HOUR)]
+    assert len(store.load(scraper.meter_id, HOUR, object_id=scraper.object_id)['A+']) == 4
+
+
+def test_sync_granularities_are_separate():
+    store = SQLiteStore(':memory:')
+    today = date.today()
+    store.sync(RangeScraper(), HOUR, today - timedelta(days=3))
+
+    scraper = RangeScraper()
+    store.sync(scraper, STScraper.GRANULARITY_DAY, today - timedelta(days=10), neto=False)
+    assert scraper.calls == [(today - timedelta(days=10), today, STScraper.GRANULARITY_DAY)]
+    assert store.load(scraper.meter_id, STScraper.GRANULARITY_DAY, neto=False) == \
+        store.load(scraper.meter_id, STScraper.GRANULARITY_DAY)['A+']